@@ -1,6 +1,7 @@
 import tkinter as tk
 from tkinterdnd2 import TkinterDnD
 import sys
+import argparse
 from src.dataprocessor import DataProcessor
 from src.teamforming import TeamForming
 from src.visualization import Visualization
@@ -8,32 +9,43 @@ from src.tooltip import Tooltip
 from src.config import Config
 from src.gui import GUI
 from src.selector import select_file
+from src.profiler import run_profiled
 
 def on_closing(root):
     root.quit()
     root.destroy()
 
-if __name__ == "__main__":
-    try:
-        filepath = select_file()
-        if not filepath:
-            sys.exit()
+def run_application():
+    filepath = select_file()
+    if not filepath:
+        sys.exit()
+
+    root = TkinterDnD.Tk()
+
+    data_processor = DataProcessor(filepath)
+    teamforming = TeamForming(data_processor)
+    visualization = Visualization(data_processor)
+    tooltip = Tooltip
+    config = Config
 
-        root = TkinterDnD.Tk()
+    # Set protocol for closing the window
+    root.protocol("WM_DELETE_WINDOW", lambda: on_closing(root))
 
-        data_processor = DataProcessor(filepath)
-        teamforming = TeamForming(data_processor)
-        visualization = Visualization(data_processor)
-        tooltip = Tooltip
-        config = Config
+    # Initialize and run the GUI
+    gui = GUI(root, data_processor, teamforming, visualization, tooltip)
+    root.mainloop()
 
-        # Set protocol for closing the window
-        root.protocol("WM_DELETE_WINDOW", lambda: on_closing(root))
-    
-        # Initialize and run the GUI
-        gui = GUI(root, data_processor, teamforming, visualization, tooltip)
-        root.mainloop()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Group Former")
+    parser.add_argument('--profile', action = 'store_true', help = "Profile the session with cProfile and tracemalloc and dump the statistics on exit.")
+    args = parser.parse_args()
+
+    try:
+        if args.profile:
+            run_profiled(run_application)
+        else:
+            run_application()
 
     except Exception as e:
         print(f"Error initializing: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
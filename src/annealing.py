@@ -0,0 +1,139 @@
+import math
+import random
+import time
+import numpy as np
+from src.profiler import profiler
+
+"""
+    The SimulatedAnnealing class is an optional metaheuristic solver for the TeamForming, which escapes the local optima
+    of the greedy rounds and the hill climbing of the LocalSearch by sometimes accepting worse moves.
+
+    Key Responsibilities:
+    - Draw random moves of single members and swaps of two members between teams, keeping the planned team sizes.
+    - Score every drawn move in O(team size) from the two changed teams, applying it only updates these two teams.
+    - Accept worse moves with a probability that falls with the temperature of a geometric cooling schedule.
+    - Keep the best assignment found and record the improvement curve for comparisons with the default engine.
+
+    The run is reproducible for the same seed, start solution and schedule.
+"""
+
+class SimulatedAnnealing:
+    def __init__(self, state, min_size, max_size, iterations = 20000, start_temperature = None, end_temperature = 0.01,
+                 move_probability = 0.3, seed = None, record_every = 500, temperature_scale = 1.0):
+        self.state = state
+        self.min_size = min_size
+        self.max_size = max_size
+        self.iterations = iterations
+        self.start_temperature = start_temperature
+        self.temperature_scale = temperature_scale # Factor of the estimated start temperature, below 1 for refined start teams
+        self.end_temperature = end_temperature
+        self.move_probability = move_probability
+        self.record_every = record_every
+        self.random = random.Random(seed)
+
+        # The run works on its own team lists, a move only touches the two changed teams in O(team size) instead of
+        # updating the members x teams sums of the TeamState
+        self.compatibility_matrix = state.compatibility_matrix
+        self.teams = [list(team) for team in state.teams]
+        self.labels = state.labels.copy()
+
+    # Summed compatibility of the member with the members of the team, the member itself is left out
+    def team_sum(self, member, team):
+        row = self.compatibility_matrix[member]
+        return sum(row[other] for other in self.teams[team] if other != member)
+
+    # Draw a random move or swap, returns its gain and a function to apply it or None if the move is not allowed
+    def draw_move(self, assigned_members):
+        teams, labels = self.teams, self.labels
+        member = assigned_members[self.random.randrange(len(assigned_members))]
+        source = labels[member]
+
+        if self.random.random() < self.move_probability:
+            target = self.random.randrange(len(teams))
+
+            # Moves only exchange the sizes of two teams like in the LocalSearch, so the planned sizes are kept
+            if target == source or len(teams[target]) != len(teams[source]) - 1 or len(teams[source]) <= self.min_size:
+                return None, None
+
+            return self.team_sum(member, target) - self.team_sum(member, source), lambda: self.move(member, target)
+
+        other_member = assigned_members[self.random.randrange(len(assigned_members))]
+        other_team = labels[other_member]
+
+        if other_team == source:
+            return None, None
+
+        pair_score = self.compatibility_matrix[member, other_member]
+        gain = (self.team_sum(member, other_team) - pair_score - self.team_sum(member, source)
+                + self.team_sum(other_member, source) - pair_score - self.team_sum(other_member, other_team))
+
+        return gain, lambda: self.swap(member, other_member)
+
+    def move(self, member, target):
+        self.teams[self.labels[member]].remove(member)
+        self.teams[target].append(member)
+        self.labels[member] = target
+
+    def swap(self, member, other_member):
+        team, other_team = self.labels[member], self.labels[other_member]
+        self.move(member, other_team)
+        self.move(other_member, team)
+
+    def estimate_start_temperature(self, assigned_members, samples = 200):
+        # Use the average absolute gain of random moves, so the first worse moves are accepted with a fair chance
+        gains = [abs(gain) for gain, _ in (self.draw_move(assigned_members) for _ in range(samples)) if gain is not None]
+        return max(float(np.mean(gains)) if gains else 1.0, self.end_temperature)
+
+    def run(self):
+        state = self.state
+        started = time.perf_counter()
+        assigned_members = np.flatnonzero(self.labels >= 0).tolist()
+
+        current_objective = state.objective()
+        best_objective = current_objective
+        best_labels = self.labels.copy()
+        curve = [(0, current_objective, best_objective)]
+        self.best_teams = [list(team) for team in self.teams]
+        self.final_teams = self.best_teams
+
+        if len(self.teams) < 2 or len(assigned_members) < 2:
+            return {'curve': curve, 'accepted': 0, 'start_objective': float(current_objective), 'best_objective': float(best_objective), 'seconds': 0.0}
+
+        start_temperature = self.start_temperature or max(self.estimate_start_temperature(assigned_members) * self.temperature_scale, self.end_temperature)
+        cooling = (self.end_temperature / start_temperature) ** (1 / max(1, self.iterations))
+        temperature = start_temperature
+        start_objective = current_objective
+        accepted = 0
+
+        for iteration in range(1, self.iterations + 1):
+            gain, apply_move = self.draw_move(assigned_members)
+
+            if gain is not None and (gain >= 0 or self.random.random() < math.exp(gain / temperature)):
+                apply_move()
+                current_objective += gain
+                accepted += 1
+
+                if current_objective > best_objective + 1e-9:
+                    best_objective = current_objective
+                    best_labels = self.labels.copy()
+
+            temperature *= cooling
+
+            if iteration % self.record_every == 0:
+                curve.append((iteration, current_objective, best_objective))
+
+        profiler.count('moves_tried', self.iterations)
+        profiler.count('moves_applied', accepted)
+
+        # The best assignment found during the run and the teams the run ended with
+        self.best_teams = [np.flatnonzero(best_labels == index).tolist() for index in range(len(self.teams))]
+        self.final_teams = [list(team) for team in self.teams]
+
+        return {
+            'curve': [(iteration, float(current), float(best)) for iteration, current, best in curve],
+            'accepted': accepted,
+            'start_temperature': start_temperature,
+            'start_objective': float(start_objective),
+            'best_objective': float(best_objective),
+            'seconds': time.perf_counter() - started
+        }
@@ -0,0 +1,99 @@
+import numpy as np
+
+"""
+    Solvers for the assignment problem, used to place the remaining members into teams and teams onto projects.
+
+    Key Responsibilities:
+    - Find the assignment of rows to columns with the highest total gain with the Hungarian method in O(n² · m).
+    - Place rows into groups with limited capacities by expanding every group into one column per free slot.
+
+    Gains of -inf mark forbidden pairs, rows without an allowed column are left unassigned.
+"""
+
+# Assign every row to a distinct column with the highest total gain, returns the column of every row or -1
+def solve_assignment(gains):
+    gains = np.asarray(gains, dtype = float)
+    rows, columns = gains.shape
+
+    if rows == 0 or columns == 0:
+        return np.full(rows, -1, dtype = int)
+
+    # The method needs at most as many rows as columns, otherwise columns are assigned to rows
+    if rows > columns:
+        row_of_column = solve_assignment(gains.T)
+        assignment = np.full(rows, -1, dtype = int)
+        assigned = row_of_column >= 0
+        assignment[row_of_column[assigned]] = np.flatnonzero(assigned)
+        return assignment
+
+    # Forbidden pairs get a cost above any sum of allowed costs and are removed from the result afterwards
+    allowed = np.isfinite(gains)
+    finite_gains = np.where(allowed, gains, 0)
+    forbidden_cost = (np.abs(finite_gains).sum() + 1) * 2
+    cost = np.where(allowed, finite_gains.max() - finite_gains if allowed.any() else 0, forbidden_cost)
+
+    # Hungarian method with row and column potentials, rows and columns are numbered from 1, column 0 is a dummy
+    row_potential = np.zeros(rows + 1)
+    column_potential = np.zeros(columns + 1)
+    row_of_column = np.zeros(columns + 1, dtype = int)
+
+    for row in range(1, rows + 1):
+        row_of_column[0] = row
+        column = 0
+        min_slack = np.full(columns + 1, np.inf)
+        previous = np.zeros(columns + 1, dtype = int)
+        used = np.zeros(columns + 1, dtype = bool)
+
+        while True:
+            used[column] = True
+            current_row = row_of_column[column]
+
+            # Reduced costs from the current row to all free columns, vectorized over the columns
+            free = ~used[1:]
+            reduced = cost[current_row - 1] - row_potential[current_row] - column_potential[1:]
+            improved = free & (reduced < min_slack[1:])
+            min_slack[1:][improved] = reduced[improved]
+            previous[1:][improved] = column
+
+            candidates = np.where(free, min_slack[1:], np.inf)
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+
+            used_columns = np.flatnonzero(used)
+            row_potential[row_of_column[used_columns]] += delta
+            column_potential[used_columns] -= delta
+            min_slack[1:][free] -= delta
+
+            column = next_column
+
+            if row_of_column[column] == 0:
+                break
+
+        # Follow the augmenting path back to the dummy column
+        while column:
+            previous_column = previous[column]
+            row_of_column[column] = row_of_column[previous_column]
+            column = previous_column
+
+    assignment = np.full(rows, -1, dtype = int)
+
+    for column in range(1, columns + 1):
+        if row_of_column[column]:
+            assignment[row_of_column[column] - 1] = column - 1
+
+    # Drop the pairs that were only filled in because no allowed column was left
+    assigned = assignment >= 0
+    assignment[assigned & ~allowed[np.arange(rows), np.maximum(assignment, 0)]] = -1
+
+    return assignment
+
+# Assign rows to groups with the given capacities and the highest total gain, returns the group of every row or -1
+def solve_capacitated_assignment(gains, capacities):
+    gains = np.asarray(gains, dtype = float)
+    capacities = np.maximum(np.asarray(capacities, dtype = int), 0)
+
+    # One column per free slot, a row never needs more slots of a group than there are rows
+    slots = np.repeat(np.arange(len(capacities)), np.minimum(capacities, gains.shape[0]))
+    assignment = solve_assignment(gains[:, slots])
+
+    return np.where(assignment >= 0, slots[np.maximum(assignment, 0)] if len(slots) else -1, -1)
@@ -0,0 +1,185 @@
+import heapq
+import time
+import numpy as np
+from src.localsearch import size_neutral_targets
+from src.profiler import profiler
+
+"""
+    The TeamHeap and BalancedSearch classes improve formed teams for the balanced objective, which maximizes the score
+    of the worst team instead of the sum of all team scores, so the weakest teams are not left over from the last rounds.
+
+    Key Responsibilities:
+    - Keep the team totals of the TeamState in a heap, so the worst team is found in O(log T) after every move.
+    - Score all moves and swaps that involve the worst team at once from the cached team sums of the TeamState.
+    - Apply the move or swap that raises the lower of the two changed team totals the most, until the worst team can
+      not be improved anymore or the time budget is used up.
+    - Report the worst team score before and after the search together with the change of the summed objective.
+
+    Every applied move raises both changed teams above the old worst score, so the sorted team scores improve with
+    every step and the search always ends.
+"""
+
+class TeamHeap:
+    def __init__(self, totals):
+        self.totals = totals # Team totals of the TeamState, updated in place by its moves
+        self.versions = [0] * len(totals)
+        self.heap = [(total, 0, index) for index, total in enumerate(totals.tolist())]
+        heapq.heapify(self.heap)
+
+    # Push the new total of a changed team, the older entries of the team become stale
+    def update(self, index):
+        self.versions[index] += 1
+        heapq.heappush(self.heap, (float(self.totals[index]), self.versions[index], index))
+
+        # Rebuild the heap when stale entries pile up
+        if len(self.heap) > 4 * len(self.versions):
+            self.heap = [(float(total), self.versions[index], index) for index, total in enumerate(self.totals)]
+            heapq.heapify(self.heap)
+
+    def worst(self):
+        # Drop stale entries until the top entry is the current total of its team
+        while self.heap[0][1] != self.versions[self.heap[0][2]]:
+            heapq.heappop(self.heap)
+
+        return self.heap[0][2]
+
+class BalancedSearch:
+    EPSILON = 1e-9 # Minimum raise of the worst team score, avoids cycling on rounding errors
+
+    def __init__(self, state, min_size, max_size, time_budget = None, max_steps = None, fixed = None, forbidden = None):
+        self.state = state
+        self.min_size = min_size
+        self.max_size = max_size
+        self.time_budget = time_budget
+        self.max_steps = max_steps # Budget independent of the machine speed, used for reproducible runs
+
+        # Pinned members never move, forbidden maps a member to the members it must not share a team with, as in the LocalSearch
+        self.fixed = np.zeros(len(state.labels), dtype = bool) if fixed is None else np.asarray(fixed, dtype = bool)
+        self.forbidden = {member: np.array(partners, dtype = int) for member, partners in (forbidden or {}).items()}
+
+    # Find the move or swap involving the worst team with the highest lower total of the two changed teams
+    def best_step(self, worst, assigned_members):
+        state = self.state
+        scores = state.individual_scores
+        members = np.array(state.teams[worst], dtype = int)
+        members = members[~self.fixed[members]]
+        others = assigned_members[(state.labels[assigned_members] != worst) & ~self.fixed[assigned_members]]
+        other_teams = state.labels[others]
+
+        # Contribution of every member to its own team and to the worst team
+        own_members = scores[members] + state.sums[members, worst]
+        own_others = scores[others] + state.sums[others, other_teams]
+        joining_others = scores[others] + state.sums[others, worst]
+
+        best_value, best_step = -np.inf, None
+
+        # Swaps of a member of the worst team with a member of another team: members x others
+        if len(members) and len(others):
+            pair_scores = state.compatibility_matrix[np.ix_(members, others)]
+            worst_totals = state.totals[worst] - own_members[:, None] + joining_others[None, :] - pair_scores
+            other_totals = (state.totals[other_teams][None, :] - own_others[None, :]
+                            + scores[members][:, None] + state.sums[members[:, None], other_teams[None, :]] - pair_scores)
+            values = np.minimum(worst_totals, other_totals)
+            self.block_swaps(values, worst, members, others, other_teams)
+            row, column = np.unravel_index(int(np.argmax(values)), values.shape)
+
+            if values[row, column] > best_value:
+                best_value, best_step = values[row, column], ('swap', int(members[row]), int(others[column]))
+
+        # Moves of a member of another team into the worst team
+        if len(others) and state.sizes[worst] < self.max_size:
+            values = np.minimum(state.totals[worst] + joining_others, state.totals[other_teams] - own_others)
+            values[(state.sizes[other_teams] <= self.min_size) | (state.sizes[other_teams] - 1 != state.sizes[worst])] = -np.inf
+
+            for column, member in enumerate(others):
+                if member in self.forbidden and (state.labels[self.forbidden[member]] == worst).any():
+                    values[column] = -np.inf
+
+            column = int(np.argmax(values))
+
+            if values[column] > best_value:
+                best_value, best_step = values[column], ('move', int(others[column]), worst)
+
+        # Moves of a member of the worst team into another team
+        if len(members) and state.sizes[worst] > self.min_size:
+            # Like in the LocalSearch, moves only exchange the sizes of two teams, so the planned sizes are kept
+            targets = np.flatnonzero((state.sizes < self.max_size) & size_neutral_targets(state.sizes, worst))
+
+            if len(targets):
+                values = np.minimum((state.totals[worst] - own_members)[:, None],
+                                    state.totals[targets][None, :] + scores[members][:, None] + state.sums[np.ix_(members, targets)])
+
+                for row, member in enumerate(members):
+                    if member in self.forbidden:
+                        values[row, np.isin(targets, state.labels[self.forbidden[member]])] = -np.inf
+
+                row, column = np.unravel_index(int(np.argmax(values)), values.shape)
+
+                if values[row, column] > best_value:
+                    best_value, best_step = values[row, column], ('move', int(members[row]), int(targets[column]))
+
+        return best_value, best_step
+
+    # Forbid the swaps that put a member into the team of a forbidden partner, unless the partner is the swapped member
+    def block_swaps(self, values, worst, members, others, other_teams):
+        labels = self.state.labels
+
+        for row, member in enumerate(members):
+            for partner in self.forbidden.get(member, ()):
+                values[row, (other_teams == labels[partner]) & (others != partner)] = -np.inf
+
+        for column, member in enumerate(others):
+            for partner in self.forbidden.get(member, ()):
+                if labels[partner] == worst:
+                    values[members != partner, column] = -np.inf
+
+    # Raise the worst team step by step until no move or swap improves it
+    def run(self):
+        state = self.state
+        started = time.perf_counter()
+        start_objective = state.objective()
+        assigned_members = np.flatnonzero(state.labels >= 0)
+        heap = TeamHeap(state.totals)
+        start_worst = float(state.totals.min()) if len(state.teams) else 0.0
+
+        moves_tried = 0
+        moves_applied = 0
+
+        while len(state.teams) > 1:
+            if self.time_budget is not None and time.perf_counter() - started > self.time_budget:
+                break
+
+            if self.max_steps is not None and moves_applied >= self.max_steps:
+                break
+
+            worst = heap.worst()
+            value, step = self.best_step(worst, assigned_members)
+            moves_tried += state.sizes[worst] * (len(assigned_members) + len(state.teams)) + len(assigned_members)
+
+            if step is None or value <= state.totals[worst] + self.EPSILON:
+                break
+
+            kind, member, other = step
+
+            if kind == 'swap':
+                other_team = state.labels[other]
+                state.swap(member, other)
+            else:
+                other_team = other if state.labels[member] == worst else state.labels[member]
+                state.move(member, other)
+
+            heap.update(worst)
+            heap.update(other_team)
+            moves_applied += 1
+
+        profiler.count('moves_tried', int(moves_tried))
+        profiler.count('moves_applied', moves_applied)
+
+        return {
+            'moves_tried': int(moves_tried),
+            'moves_applied': moves_applied,
+            'worst_before': start_worst,
+            'worst_after': float(state.totals.min()) if len(state.teams) else 0.0,
+            'improvement': float(state.objective() - start_objective),
+            'seconds': time.perf_counter() - started
+        }
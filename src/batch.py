@@ -0,0 +1,178 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.dataprocessor import DataProcessor
+from src.teamforming import TeamForming
+
+"""
+    The BatchRunner class forms teams for many events at once, for example all course sections at the start of a semester.
+    Every event has its own survey CSV and scoring configuration and is processed in its own worker process.
+
+    Key Responsibilities:
+    - Collect the events from a directory of survey CSV files or from a JSON manifest.
+    - Process the events concurrently in a process pool, with an isolated DataProcessor and TeamForming per event.
+    - Write the transformed survey and the formed teams of every event into its own output folder.
+    - Write a summary table with the number of members, teams, remaining members and timings per event.
+
+    A directory is read as one event per CSV file, a JSON file with the same name next to the CSV file is used as its config.
+    A manifest has the form {"config": {...}, "events": [{"name": "...", "survey": "path.csv", "config": {...}}]}, the
+    top level config is used as default for all events. The configs use the same keys as the TeamService. Event names
+    are reduced to letters, digits, spaces, dots, dashes and underscores, so every event folder stays inside the output directory.
+    The batch is started with: python -m src.batch path/to/surveys --output results --workers 4
+"""
+
+# Folder name of an event, names from a manifest must not point outside the output directory like '../x' or '/tmp/x'
+def event_folder_name(name):
+    name = re.sub(r'[^\w .-]', '_', str(name)).strip().lstrip('.')
+    return name or 'event'
+
+# Form the teams of a single event, executed inside a worker process
+def run_event(event, output_dir):
+    event_dir = os.path.join(output_dir, event_folder_name(event['name']))
+    os.makedirs(event_dir, exist_ok = True)
+
+    summary = {'event': event['name'], 'survey': event['survey'], 'status': 'done', 'error': ''}
+    started = time.perf_counter()
+
+    try:
+        # Every event writes its transformed survey into its own folder instead of the shared storage file
+        data_processor = DataProcessor(event['survey'], os.path.join(event_dir, 'transformed_results_survey.csv'))
+        data_processor.apply_config(event['config'])
+        loaded = time.perf_counter()
+
+        total_members = len(data_processor.get_data())
+        desired_size, min_size, max_size = TeamForming.adjust_team_sizes(
+            total_members,
+            int(event['config'].get('desired_size', 4)),
+            int(event['config'].get('min_size', 3)),
+            int(event['config'].get('max_size', 5))
+            )
+
+        teamforming = TeamForming(data_processor)
+        teams, remaining_members = teamforming.generate_teams(
+            desired_size, min_size, max_size,
+            objective = event['config'].get('objective', 'sum'),
+            skill_tolerance = event['config'].get('skill_tolerance'),
+            hard_balance = bool(event['config'].get('hard_balance', False)),
+            diversity_weight = event['config'].get('diversity_weight'),
+            diversity_measure = event['config'].get('diversity_measure', 'entropy'),
+            roles = event['config'].get('roles'),
+            seed = event['config'].get('seed')
+            )
+        solved = time.perf_counter()
+
+        df = data_processor.get_data()
+        rows = []
+
+        for index, team in enumerate(teams):
+            for member in team:
+                rows.append({
+                    'team': index + 1,
+                    'member': int(member),
+                    'name': df.loc[member, 'Name'] if 'Name' in df.columns else ''
+                    })
+
+        pd.DataFrame(rows, columns = ['team', 'member', 'name']).to_csv(os.path.join(event_dir, 'teams.csv'), index = False)
+
+        summary.update({
+            'members': total_members,
+            'teams': len(teams),
+            'remaining': len(remaining_members),
+            'load_seconds': round(loaded - started, 4),
+            'solve_seconds': round(solved - loaded, 4),
+            })
+
+    except (Exception, SystemExit) as e:
+        # DataProcessor exits when a survey cannot be loaded, which must not stop the other events
+        summary.update({'status': 'failed', 'error': str(e) or type(e).__name__})
+
+    summary['total_seconds'] = round(time.perf_counter() - started, 4)
+
+    return summary
+
+class BatchRunner:
+    SUMMARY_COLUMNS = ['event', 'survey', 'status', 'members', 'teams', 'remaining', 'load_seconds', 'solve_seconds', 'total_seconds', 'error']
+
+    def __init__(self, source, output_dir = 'batch_results', max_workers = None):
+        self.source = source
+        self.output_dir = output_dir
+        self.max_workers = max_workers
+        self.events = self.load_events(source)
+
+    # Load the events either from a directory with survey CSV files or from a JSON manifest
+    def load_events(self, source):
+        events = []
+
+        if os.path.isdir(source):
+            for filepath in sorted(glob.glob(os.path.join(source, '*.csv'))):
+                config_file = os.path.splitext(filepath)[0] + '.json'
+                config = {}
+
+                if os.path.exists(config_file):
+                    with open(config_file, 'r') as file:
+                        config = json.load(file)
+
+                events.append({'survey': filepath, 'config': config})
+
+        else:
+            with open(source, 'r') as file:
+                manifest = json.load(file)
+
+            base_dir = os.path.dirname(os.path.abspath(source))
+            default_config = manifest.get('config', {})
+
+            for entry in manifest.get('events', []):
+                events.append({
+                    'name': entry.get('name'),
+                    'survey': os.path.join(base_dir, entry['survey']),
+                    'config': {**default_config, **entry.get('config', {})}
+                    })
+
+        # Use the survey file name as event name and make the names unique, they are used as output folders
+        names = set()
+        for event in events:
+            name = event_folder_name(event.get('name') or os.path.splitext(os.path.basename(event['survey']))[0])
+            unique_name = name
+            suffix = 2
+
+            while unique_name in names:
+                unique_name = f"{name}_{suffix}"
+                suffix += 1
+
+            names.add(unique_name)
+            event['name'] = unique_name
+
+        return events
+
+    # Process all events concurrently and write the summary table
+    def run(self):
+        os.makedirs(self.output_dir, exist_ok = True)
+        summaries = []
+
+        with ProcessPoolExecutor(max_workers = self.max_workers) as executor:
+            futures = [executor.submit(run_event, event, self.output_dir) for event in self.events]
+
+            for future in as_completed(futures):
+                summary = future.result()
+                summaries.append(summary)
+                print(f"{summary['event']}: {summary['status']} in {summary['total_seconds']}s")
+
+        summary_table = pd.DataFrame(summaries, columns = self.SUMMARY_COLUMNS).sort_values('event')
+        summary_table.to_csv(os.path.join(self.output_dir, 'summary.csv'), index = False)
+
+        return summary_table
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Form teams for many surveys in parallel.")
+    parser.add_argument('source', help = "Directory with survey CSV files or a JSON manifest.")
+    parser.add_argument('--output', default = 'batch_results', help = "Directory for the per event results and the summary.")
+    parser.add_argument('--workers', type = int, default = None, help = "Number of worker processes.")
+    args = parser.parse_args()
+
+    batch_runner = BatchRunner(args.source, args.output, args.workers)
+    print(batch_runner.run().to_string(index = False))
@@ -0,0 +1,79 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from src.dataprocessor import DataProcessor
+from src.teamforming import TeamForming
+from src.localsearch import TeamState
+
+"""
+    The benchmark compares the team formation engines of the TeamForming on the same survey and team sizes.
+
+    Key Responsibilities:
+    - Run the default engine and the greedy, refined greedy, balanced greedy, sparse, hierarchical and simulated annealing variants.
+    - Measure the runtime of every engine.
+    - Score the resulting teams with the same objective and report the total, the worst team and the remaining members.
+
+    The default engine searches all combinations and is skipped for surveys larger than --default-limit members.
+    The benchmark is started with: python -m src.benchmark survey.csv --sizes 4 3 5 --seed 1
+"""
+
+def run_benchmark(data_processor, desired_size, min_size, max_size, seed = 0, iterations = None, default_limit = 60):
+    teamforming = TeamForming(data_processor)
+    individual_scores = np.array(list(teamforming.calculate_individual_scores().values()))
+    compatibility_matrix = teamforming.build_compatibility_matrix()
+
+    engines = {
+        'greedy': lambda: teamforming.generate_teams_greedy(desired_size, min_size, max_size),
+        'greedy_refined': lambda: teamforming.generate_teams_greedy(desired_size, min_size, max_size, refine = True),
+        'greedy_balanced': lambda: teamforming.generate_teams_greedy(desired_size, min_size, max_size, refine = True, objective = 'balanced'),
+        'sparse': lambda: teamforming.generate_teams_sparse(desired_size, min_size, max_size),
+        'hierarchical': lambda: teamforming.generate_teams_hierarchical(desired_size, min_size, max_size),
+        'annealing': lambda: teamforming.generate_teams_annealing(desired_size, min_size, max_size, iterations, seed),
+    }
+
+    if len(individual_scores) <= default_limit:
+        engines = {'default': lambda: teamforming.generate_teams(desired_size, min_size, max_size), **engines}
+
+    rows = []
+
+    for name, engine in engines.items():
+        started = time.perf_counter()
+        teams, remaining_members = engine()
+        seconds = time.perf_counter() - started
+
+        state = TeamState(teams, individual_scores, compatibility_matrix)
+        team_scores = [state.team_score(index) for index in range(len(state.teams))]
+
+        rows.append({
+            'engine': name,
+            'seconds': round(seconds, 4),
+            'objective': round(float(sum(team_scores)), 4),
+            'worst_team': round(float(min(team_scores)), 4) if team_scores else 0,
+            'teams': len(teams),
+            'remaining': len(remaining_members)
+            })
+
+    return pd.DataFrame(rows), getattr(teamforming, 'annealing_report', None)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Compare the team formation engines on a survey.")
+    parser.add_argument('survey', help = "Survey CSV file.")
+    parser.add_argument('--sizes', type = int, nargs = 3, default = [4, 3, 5], metavar = ('DESIRED', 'MIN', 'MAX'))
+    parser.add_argument('--seed', type = int, default = 0)
+    parser.add_argument('--iterations', type = int, default = None, help = "Iterations of the simulated annealing. Defaults to members x teams / 2.")
+    parser.add_argument('--default-limit', type = int, default = 60, help = "Largest survey for the default engine.")
+    args = parser.parse_args()
+
+    results, annealing_report = run_benchmark(DataProcessor(args.survey), *args.sizes, args.seed, args.iterations, args.default_limit)
+    print(results.to_string(index = False))
+
+    if annealing_report:
+        print("Annealing improvement curve (iteration, current, best):")
+        for iteration, current, best in annealing_report['curve']:
+            print(f"  {iteration:>8} {current:12.2f} {best:12.2f}")
+
+        # Gain over the refined greedy teams the annealing started from
+        print(f"Annealing start {annealing_report['start_objective']:.2f}, best of the run {annealing_report['best_objective']:.2f}, "
+              f"after polishing {annealing_report['final_objective']:.2f}, "
+              f"gain {annealing_report['final_objective'] - annealing_report['start_objective']:.2f}")
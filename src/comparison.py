@@ -0,0 +1,100 @@
+import threading
+import tkinter as tk
+from tkinter import ttk
+from src.sizecomparison import SizeComparison
+
+"""
+    The Comparison class is responsible for the team size comparison window of the Group Former application.
+    It creates a new window using the tkinter library to compare several team sizes before generating the teams.
+
+    Key Responsibilities:
+    - Initialize the comparison window and configure its appearance.
+    - Solve the configurations around the desired team size in a background thread, so the main window stays responsive.
+    - Display the planned sizes, the objective, the worst team score and the remaining members side by side.
+    - Take over the sizes of a selected configuration into the size entries of the GUI.
+"""
+
+class Comparison:
+    def __init__(self, root, data_processor, gui, font_settings):
+        self.root = root
+        self.data_processor = data_processor
+        self.gui = gui
+        self.font_settings = font_settings
+        self.main_color = '#6f12c0'
+        self.results = None
+        self.error = None
+
+        self.create_comparison_window()
+
+    # Create the comparison window and start solving the configurations
+    def create_comparison_window(self):
+        self.comparison_window = tk.Toplevel(self.root)
+        self.comparison_window.title("Compare Team Sizes")
+        self.comparison_window.geometry("640x260")
+
+        self.results_frame = ttk.Frame(self.comparison_window, padding = "3 3 12 12")
+        self.results_frame.pack(fill = "both", expand = True)
+
+        ttk.Label(self.results_frame, text = "Solving...", font = (self.font_settings, 11)).grid(row = 0, column = 0, padx = 10, pady = 5, sticky = tk.W)
+
+        configurations = SizeComparison.around(int(self.gui.team_size_var.get()))
+        threading.Thread(target = self.run_comparison, args = (configurations,), daemon = True).start()
+        self.comparison_window.after(100, self.check_results)
+
+    # Executed in the background thread, the results are displayed by check_results
+    def run_comparison(self, configurations):
+        try:
+            self.results = SizeComparison(self.data_processor).run(configurations)
+
+        except Exception as e:
+            self.error = e
+
+    # Poll for the results, tkinter widgets may only be changed from the main thread
+    def check_results(self):
+        if self.error is not None:
+            print(f"Error comparing team sizes: {self.error}")
+            self.comparison_window.destroy()
+        elif self.results is None:
+            self.comparison_window.after(100, self.check_results)
+        else:
+            self.show_results()
+
+    def show_results(self):
+        for widget in self.results_frame.winfo_children():
+            widget.destroy()
+
+        font_settings = (self.font_settings, 11)
+        headers = ["Sizes", "Plan", "Score", "Worst Team", "Remaining"]
+
+        for column, header in enumerate(headers):
+            ttk.Label(self.results_frame, text = header, foreground = self.main_color, font = font_settings).grid(row = 0, column = column, padx = 5, pady = 5, sticky = tk.W)
+
+        # Mark the best value of every column, so the trade-off is visible at a glance
+        best_objective = self.results['objective'].max()
+        best_worst_team = self.results['worst_team'].max()
+
+        for row, result in enumerate(self.results.itertuples(index = False), start = 1):
+            values = [
+                f"{result.desired_size} ({result.min_size}-{result.max_size})",
+                result.plan,
+                f"{result.objective:.1f}" + (" *" if result.objective == best_objective else ""),
+                f"{result.worst_team:.1f}" + (" *" if result.worst_team == best_worst_team else ""),
+                result.remaining
+            ]
+
+            for column, value in enumerate(values):
+                ttk.Label(self.results_frame, text = value, font = font_settings).grid(row = row, column = column, padx = 5, pady = 2, sticky = tk.W)
+
+            ttk.Button(
+                self.results_frame,
+                text = "Use",
+                style = 'Custom.TButton',
+                command = lambda r=result: self.use_sizes(r.desired_size, r.min_size, r.max_size)
+                ).grid(row = row, column = len(values), padx = 5, pady = 2)
+
+    # Take over the sizes into the GUI, the teams are generated with the Generate button as usual
+    def use_sizes(self, desired_size, min_size, max_size):
+        self.gui.team_size_var.set(str(desired_size))
+        self.gui.min_team_size_var.set(str(min_size))
+        self.gui.max_team_size_var.set(str(max_size))
+        self.comparison_window.destroy()
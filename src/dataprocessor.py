@@ -1,8 +1,13 @@
+import io
 import sys
 import os
 import pandas as pd
 import json
 import re
+import types
+import weakref
+from src.profiler import profiler
+from src.scoringconfig import ScoringConfig
 
 """
     The DataProcessor class is responsible for handling and processing the data used in the Group Former application.
@@ -16,8 +21,10 @@ import re
     - Process survey results to transform and map the data according to the questionnaire interpreter.
     - Normalize weights to ensure they sum up to 1 and fall within the range 0 to 1.
     - Provide methods to retrieve various attributes and weights.
-    - Manage homogenous, heterogenous, and emphasized attributes.
+    - Manage homogenous, heterogenous, and emphasized attributes in an immutable ScoringConfig and notify listeners
+      about every change.
     - Apply the questionnaire interpreter to the survey results to map and scale the data.
+    - Profile the columns at load time and leave identifiers, free text and empty columns out of the scoring.
     - Handle user interactions such as reloading survey results and adjusting weights.
 
     The class interacts with the GUI and Config classes to provide the necessary data for displaying and managing the
@@ -29,21 +36,37 @@ class DataProcessor:
     STD_WEIGHT_FILE = 'storage/std_weights.csv'
     CUSTOM_WEIGHT_FILE = 'storage/custom_weights.csv'
     INTERPRETER_FILE = 'storage/interpreter.json'
+    TRANSFORMED_FILE = 'storage/transformed_results_survey.csv'
+
+    # Columns whose answers are at least this unique and have at least this many distinct values are not scored
+    IDENTIFIER_UNIQUENESS = 0.8
+    IDENTIFIER_MIN_VALUES = 5
+
+    # Checkbox answers that mean the option was not selected
+    NOT_SELECTED = frozenset({'No', 'nan', ''})
+
+    def __init__(self, filepath, transformed_filepath = TRANSFORMED_FILE):
+        # Path of the transformed survey results, separate paths keep concurrently processed surveys apart
+        self.transformed_filepath = transformed_filepath
+
+        # Start a new profiling run for the loaded survey
+        profiler.reset()
 
-    def __init__(self, filepath):
         # Load CSV files, weights, and questionnaire interpreter on initialization
         self.results_survey = self.load_csv_file(filepath)
         self.weights = self.load_weights(self.STD_WEIGHT_FILE)
         self.custom_weights = self.load_weights(self.CUSTOM_WEIGHT_FILE)
-        self.current_weights = self.weights.copy()
         self.questionnaire_interpreter = self.load_questionnaire_interpreter()
 
-        # Define attribute lists and dictionaries
+        # Scoring configuration with the current weights and attribute sets, replaced on every change
+        self.config_listeners = []
+        self.scoring_config = ScoringConfig(self.weights)
+
+        # Define attribute lists and the column profiles
         self.skill_attributes = []
-        self.homogenous_attributes = []
-        self.heterogenous_attributes = []
-        self.emphasized_attributes = []
-        self.emphasized_attributes_type = {}
+        self.multi_select_attributes = set()  # Columns merged from several checkbox columns
+        self.selections = {}  # Options every member selected in the checkbox columns of a merged attribute
+        self.column_profiles = {}
 
         # Process survey results
         results_survey_transformed = self.process_survey_results()
@@ -51,13 +74,56 @@ class DataProcessor:
         # Sort the transformed survey results alphabetically, only columns
         results_survey_transformed = results_survey_transformed.reindex(sorted(results_survey_transformed.columns), axis = 1)
 
-        results_survey_transformed.to_csv('storage/transformed_results_survey.csv', index = False)
+        results_survey_transformed.to_csv(self.transformed_filepath, index = False)
 
         # Load the transformed survey results
-        self.df = pd.read_csv('storage/transformed_results_survey.csv')
+        self.df = pd.read_csv(self.transformed_filepath)
         self.apply_interpreter()
 
+    # Listeners are local to the process, a copy sent to a worker process starts without them
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['config_listeners'] = []
+        return state
+
+    # Register a callable that receives the old and the new ScoringConfig after every change. Bound methods are held
+    # weakly, so a TeamForming replaced after a survey reload is not kept alive and called by the DataProcessor
+    def add_config_listener(self, listener):
+        if isinstance(listener, types.MethodType):
+            self.config_listeners.append(weakref.WeakMethod(listener))
+        else:
+            self.config_listeners.append(lambda: listener)
+
+    def remove_config_listener(self, listener):
+        self.config_listeners = [reference for reference in self.config_listeners if reference() not in (None, listener)]
+
+    def set_scoring_config(self, config):
+        old_config = self.scoring_config
+
+        if config == old_config:
+            return
+
+        self.scoring_config = config
+
+        # Listeners of collected objects are dropped on the way
+        self.config_listeners = [reference for reference in self.config_listeners if reference() is not None]
+
+        for reference in list(self.config_listeners):
+            listener = reference()
+
+            if listener is not None:
+                listener(old_config, config)
+
+    @property
+    def current_weights(self):
+        return dict(self.scoring_config.weights)
+
+    @current_weights.setter
+    def current_weights(self, weights):
+        self.set_scoring_config(self.scoring_config.with_weights(weights))
+
     # Load a CSV file from the given filepath
+    @profiler.timed('load_csv_file')
     def load_csv_file(self, filepath):
         try:
             if not os.path.exists(filepath):
@@ -169,32 +235,10 @@ class DataProcessor:
             print(f"Error loading questionnaire interpreter: {e}")
             return {}
         
+    @profiler.timed('apply_interpreter')
     def apply_interpreter(self):
         try:
-            # Apply the entry mappings to specific columns
-            for column, mappings in self.questionnaire_interpreter.get('entry_mapping', {}).items():
-                if column in self.df.columns:
-
-                    # Ensure the column values are strings
-                    self.df[column] = self.df[column].astype(str)
-
-                    # Split the values in the column
-                    self.df[column] = self.df[column].apply(
-                        lambda x: ', '.join([
-                            mappings.get(value.strip(), value.strip()) for value, (key, mappings) in zip(x.split(', '), self.questionnaire_interpreter['entry_mapping'][column].items())
-                        ])
-                    )
-
-            # Apply scale mappings for skill levels
-            for column, scale_info in self.questionnaire_interpreter.get('SkillLevelAssessment', {}).items():
-                scale = scale_info.get('scale', {})
-
-                if column in self.df.columns and isinstance(scale, dict):
-                    # Ensure the column values are strings and map the scale
-                    self.df[column] = self.df[column].astype(str)
-                    self.df[column] = self.df[column].apply(
-                        lambda x: ', '.join([scale.get(value.strip(), value.strip()) for value in x.split(', ')])
-                    )
+            self.df = self.interpret_entries(self.df)
 
             all_attributes = self.df.columns
 
@@ -204,61 +248,160 @@ class DataProcessor:
                 if attribute in skill_attributes_keys:
                     self.skill_attributes.append(str(attribute))
 
+            # Identifiers, free text and empty columns are left out of the scoring, they can still be added in the GUI
+            self.column_profiles = self.profile_columns(self.df)
+
             for attribute in all_attributes:
                 if attribute in self.skill_attributes:
                     self.add_homogenous_attribute(attribute)
+                elif self.column_profiles[attribute]['excluded']:
+                    self.remove_attribute(attribute)
                 else:
                     self.add_heterogenous_attribute(attribute)
                     
         except Exception as e:
             print(f"Error applying interpreter: {e}")
 
+    # Measure the answered rows, distinct values and uniqueness of every column and classify it
+    @profiler.timed('profile_columns')
+    def profile_columns(self, df):
+        profiles = {}
+
+        for column in df.columns:
+            answers = df[column].dropna()
+            answers = answers[answers.astype(str).str.strip() != '']
+            distinct = int(answers.nunique())
+            uniqueness = distinct / len(answers) if len(answers) else 0.0
+
+            if column in self.skill_attributes or column in self.multi_select_attributes:
+                kind = 'attribute' # Skills and merged checkbox answers are always scored
+            elif distinct == 0:
+                kind = 'empty'
+            elif distinct == 1:
+                kind = 'constant'
+            elif uniqueness >= self.IDENTIFIER_UNIQUENESS and distinct >= self.IDENTIFIER_MIN_VALUES:
+                # Answers of several words are free text, single tokens such as names or ids are identifiers
+                words = answers.astype(str).str.split().str.len().mean()
+                kind = 'free text' if words >= 2 else 'identifier'
+            else:
+                kind = 'attribute'
+
+            profiles[column] = {
+                'answered': len(answers),
+                'distinct': distinct,
+                'uniqueness': round(uniqueness, 4),
+                'kind': kind,
+                'excluded': kind != 'attribute'
+            }
+
+        return profiles
+
+    # Apply the entry mappings and skill scales of the questionnaire interpreter to the given survey rows
+    def interpret_entries(self, df):
+        # Apply the entry mappings to specific columns, merged checkbox columns already hold the mapped options
+        for column, mappings in self.questionnaire_interpreter.get('entry_mapping', {}).items():
+            if column in df.columns and column not in self.multi_select_attributes:
+
+                # Ensure the column values are strings
+                df[column] = df[column].astype(str)
+
+                # Split the values in the column
+                df[column] = df[column].apply(
+                    lambda x: ', '.join([
+                        mappings.get(value.strip(), value.strip()) for value, (key, mappings) in zip(x.split(', '), self.questionnaire_interpreter['entry_mapping'][column].items())
+                    ])
+                )
+
+        # Apply scale mappings for skill levels
+        for column, scale_info in self.questionnaire_interpreter.get('SkillLevelAssessment', {}).items():
+            scale = scale_info.get('scale', {})
+
+            if column in df.columns and isinstance(scale, dict):
+                # Ensure the column values are strings and map the scale
+                df[column] = df[column].astype(str)
+                df[column] = df[column].apply(
+                    lambda x: ', '.join([scale.get(value.strip(), value.strip()) for value in x.split(', ')])
+                )
+
+        return df
+
     # Take a list of lists and flatten it into a single list by concatenating all sublists
     def flatten_lists(self, lists):
         # Flatten a list of lists
         return [item for sublist in lists for item in (sublist if isinstance(sublist, list) else [sublist])]
         
     def add_homogenous_attribute(self, attribute):
-        # Add a homogenous attribute to the list and remove it from the heterogenous list
-        if attribute not in self.homogenous_attributes:
-            self.homogenous_attributes.append(attribute)
-
-        if attribute in self.heterogenous_attributes:
-            self.heterogenous_attributes.remove(attribute)
+        # Add a homogenous attribute and remove it from the heterogenous attributes
+        self.set_scoring_config(self.scoring_config.with_homogenous(attribute))
 
     def add_heterogenous_attribute(self, attribute):
-        # Add a heterogenous attribute to the list and remove it from the homogenous list
-        if attribute not in self.heterogenous_attributes:
-            self.heterogenous_attributes.append(attribute)
-
-        if attribute in self.homogenous_attributes:
-            self.homogenous_attributes.remove(attribute)
+        # Add a heterogenous attribute and remove it from the homogenous attributes
+        self.set_scoring_config(self.scoring_config.with_heterogenous(attribute))
 
     def add_emphasized_attribute(self, attribute):
-        # Add an emphasized attribute to the list
-        if attribute not in self.emphasized_attributes:
-            self.emphasized_attributes.append(attribute)
+        # Add an emphasized attribute
+        self.set_scoring_config(self.scoring_config.with_emphasized(attribute))
 
     def remove_emphasized_attribute(self, attribute):
-        # Remove an emphasized attribute from the list
-        if attribute in self.emphasized_attributes:
-            self.emphasized_attributes.remove(attribute)
+        # Remove an emphasized attribute
+        self.set_scoring_config(self.scoring_config.without_emphasized(attribute))
 
-            if attribute in self.emphasized_attributes_type:
-                del self.emphasized_attributes_type[attribute]
+    def set_ordinal_skills(self, ordinal):
+        # Match skill levels by their distance on the scale or only by exact equality
+        self.set_scoring_config(self.scoring_config.with_ordinal(ordinal))
 
     def remove_attribute(self, attribute):
-        # Remove an attribute from both lists
-        if attribute in self.homogenous_attributes:
-            self.homogenous_attributes.remove(attribute)
-
-        elif attribute in self.heterogenous_attributes:
-            self.heterogenous_attributes.remove(attribute)
-
-        if attribute in self.emphasized_attributes:
-            self.emphasized_attributes.remove(attribute)
+        # Remove an attribute from the homogenous, heterogenous and emphasized attributes
+        self.set_scoring_config(self.scoring_config.without_attribute(attribute))
+
+    # Apply a scoring configuration, for example received through the service, on top of the current settings or
+    # in place of the current attribute lists, for example when a snapshot is restored
+    def apply_config(self, config, replace = False):
+        columns = set(self.df.columns)
+        scoring_config = self.scoring_config
+
+        if replace:
+            scoring_config = scoring_config.replace(homogenous = (), heterogenous = (), emphasized = ())
+
+        # The changes are collected first, so listeners are notified once for the whole configuration
+        weights = scoring_config.weights
+        scoring_config = scoring_config.with_weights({
+            attribute: float(config.get('weights', {}).get(attribute, weight)) for attribute, weight in weights.items()
+            })
+
+        for attribute in config.get('homogenous', []):
+            if attribute in columns:
+                scoring_config = scoring_config.with_homogenous(attribute)
+
+        for attribute in config.get('heterogenous', []):
+            if attribute in columns:
+                scoring_config = scoring_config.with_heterogenous(attribute)
+
+        for attribute in config.get('emphasized', []):
+            if attribute in columns:
+                scoring_config = scoring_config.with_emphasized(attribute)
+
+        for attribute in config.get('removed', []):
+            scoring_config = scoring_config.without_attribute(attribute)
+
+        if 'ordinal' in config:
+            scoring_config = scoring_config.with_ordinal(config['ordinal'])
+
+        self.set_scoring_config(scoring_config)
+
+    # Return the current scoring configuration in the same format accepted by apply_config
+    def get_config(self):
+        return {
+            'weights': dict(self.current_weights),
+            'homogenous': sorted(self.scoring_config.homogenous),
+            'heterogenous': sorted(self.scoring_config.heterogenous),
+            'emphasized': list(self.scoring_config.emphasized),
+            'removed': sorted(self.get_not_considered_attributes()),
+            'ordinal': self.scoring_config.ordinal,
+        }
 
     # Process survey results to merge columns with same name and transform the data
+    @profiler.timed('process_survey_results')
     def process_survey_results(self):
         try:
             column_groups = {}
@@ -285,9 +428,14 @@ class DataProcessor:
 
                 # The length of the columns should be greater than 1 to merge them
                 if len(cols) > 1:
+                    self.multi_select_attributes.add(base_name)
+
+                    # Every checkbox column is read on its own, so empty unchecked cells can not shift the options
+                    options = [[option for option in row if isinstance(option, str)] for row in self.checkbox_options(base_name, cols).to_numpy()]
+                    self.selections[base_name] = pd.Series([frozenset(row) for row in options], dtype = object)
 
-                    # Concatenate the values of the columns with the same base name
-                    self.results_survey[base_name] = self.results_survey[cols].apply(lambda x: ', '.join(x.dropna()), axis = 1)
+                    # Concatenate the selected options of the columns with the same base name
+                    self.results_survey[base_name] = [', '.join(row) for row in options]
 
                     # Drop the original columns after merging
                     self.results_survey.drop(columns = cols, inplace = True)
@@ -302,17 +450,71 @@ class DataProcessor:
             print(f"Error processing survey results: {e}")
             return pd.DataFrame()
         
+    # Option of every answered cell of the checkbox columns, named by the entry mapping of its column, None for cells
+    # that are empty or not selected
+    def checkbox_options(self, base_name, cols):
+        mappings = self.questionnaire_interpreter.get('entry_mapping', {}).get(base_name, {})
+        options = pd.DataFrame(index = self.results_survey.index, columns = cols, dtype = object)
+
+        for col in cols:
+            suffix = re.match(r'.+?\[(.*?)\]$', col).group(1)
+            values = self.results_survey[col].astype(str).str.strip()
+            selected = ~values.isin(self.NOT_SELECTED)
+
+            # Values without an entry mapping are named by the column, for example 'Conc01' or 'mot1: Completely'
+            fallback = (f"{suffix}: " + values).where(values != 'Yes', suffix)
+            options.loc[selected, col] = values[selected].map(mappings.get(col, {})).fillna(fallback[selected])
+
+        return options
+
     def reload_survey(self, filepath):
         # Reload the survey results and go through the processing steps again
         self.attributes = []
         self.skill_attributes = []
+        self.multi_select_attributes = set()
+        self.selections = {}
+
+        profiler.reset()
 
         self.results_survey = self.load_csv_file(filepath)
         results_survey_transformed = self.process_survey_results()
-        results_survey_transformed.to_csv('storage/transformed_results_survey.csv', index = False)
-        self.df = pd.read_csv('storage/transformed_results_survey.csv')
+        results_survey_transformed.to_csv(self.transformed_filepath, index = False)
+        self.df = pd.read_csv(self.transformed_filepath)
         self.apply_interpreter()
 
+    # Append late registrations to the loaded survey without processing the loaded rows again, returns the new members
+    def append_survey(self, filepath):
+        processed_survey, selections = self.results_survey, self.selections
+        self.results_survey, self.selections = self.load_csv_file(filepath), {}
+
+        try:
+            new_rows = self.process_survey_results()
+            new_selections = self.selections
+
+        finally:
+            self.results_survey, self.selections = processed_survey, selections
+
+        # The selected options of the new members follow the ones of the loaded members
+        for attribute, options in self.selections.items():
+            new_options = new_selections.get(attribute, pd.Series([frozenset()] * len(new_rows), dtype = object))
+            self.selections[attribute] = pd.concat([options, new_options], ignore_index = True)
+
+        # Append the new rows to the transformed survey and parse only them back, so they get the same types as a full reload
+        columns = pd.read_csv(self.transformed_filepath, nrows = 0).columns
+        new_csv = new_rows.reindex(columns = columns).to_csv(header = False, index = False)
+
+        with open(self.transformed_filepath, 'a', newline = '') as file:
+            file.write(new_csv)
+
+        new_rows = pd.read_csv(io.StringIO(new_csv), names = columns, header = None)
+        new_rows = self.interpret_entries(new_rows)
+
+        # Add all rows at once, the TeamForming and Visualization read the data frame from the DataProcessor
+        first_member = len(self.df)
+        self.df = pd.concat([self.df, new_rows[self.df.columns]], ignore_index = True)
+
+        return list(range(first_member, len(self.df)))
+
     def get_data(self):
         # Return the loaded data
         return self.df
@@ -337,29 +539,44 @@ class DataProcessor:
         # Return all the attributes except the skill attributes
         return sorted(list(set(self.df.columns) - set(self.skill_attributes)))
 
+    def get_scoring_config(self):
+        # Return the current immutable scoring configuration
+        return self.scoring_config
+
     def get_homogenous_attributes(self):
-        # Return the flattened homogenous attributes
-        return self.homogenous_attributes
+        # Return the homogenous attributes in alphabetical order
+        return sorted(self.scoring_config.homogenous)
 
     def get_heterogenous_attributes(self):
-        # Return the flattened heterogenous attributes
-        return self.heterogenous_attributes
+        # Return the heterogenous attributes in alphabetical order
+        return sorted(self.scoring_config.heterogenous)
 
     def get_emphasized_attributes(self):
-        # Return the emphasized attributes
-        return self.emphasized_attributes
+        # Return the emphasized attributes in the order they were emphasized
+        return list(self.scoring_config.emphasized)
 
     def get_emphasized_attributes_type(self):
-        # Return the emphasized attributes type
-        for attribute in self.emphasized_attributes:
-            if attribute in self.homogenous_attributes:
-                self.emphasized_attributes_type[attribute] = 'homogenous'
-            elif attribute in self.heterogenous_attributes:
-                self.emphasized_attributes_type[attribute] = 'heterogenous'
-        return self.emphasized_attributes_type
+        # Return the emphasized attributes type, derived once per configuration
+        return self.scoring_config.emphasized_types
+
+    # Options every member selected for a multi-select attribute, in the order of the members
+    def get_selections(self, attribute):
+        return self.selections[attribute]
+
+    def get_multi_select_attributes(self):
+        # Return the columns merged from several checkbox columns
+        return self.multi_select_attributes
+
+    def get_column_profiles(self):
+        # Return the profile of every column measured at load time
+        return self.column_profiles
+
+    def get_excluded_attributes(self):
+        # Return the columns left out of the scoring by the column profiling
+        return sorted(column for column, profile in self.column_profiles.items() if profile['excluded'])
 
     def get_not_considered_attributes(self):
         # Return the removed attributes
         all_attributes = set(self.flatten_lists([self.get_skill_attributes(), self.get_other_attributes()]))
-        current_attributes = set(self.get_homogenous_attributes() + self.get_heterogenous_attributes())
+        current_attributes = self.scoring_config.homogenous | self.scoring_config.heterogenous
         return list(all_attributes - current_attributes)
\ No newline at end of file
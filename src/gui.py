@@ -5,7 +5,13 @@ from tkextrafont import Font
 from tkinterdnd2 import DND_FILES
 from PIL import Image, ImageTk
 from src.config import Config
+from src.performance import Performance
+from src.overrides import Overrides
+from src.comparison import Comparison
+from src.projectassignment import ProjectAssignment
 from src.teamforming import TeamForming
+from src.snapshot import Snapshot
+from src.resultcache import ResultCache
 from src.visualization import Visualization
 from src.selector import select_file
 
@@ -38,6 +44,9 @@ class GUI:
         self.visualization = visualization
         self.tooltip = tooltip
 
+        # On-disk cache of generated teams, repeated configurations skip the search
+        self.result_cache = ResultCache()
+
         self.main_color = '#6f12c0'
         self.secondary_color = '#d4c9ef'
         self.scrollable_frame_color = '#f0f0f0'
@@ -50,6 +59,11 @@ class GUI:
         # Set the maximum number of emphasized attributes
         self.max_emphasis = 4
 
+        # Penalty for moving a member out of the current team when the teams are kept
+        self.stability_penalty = 5.0
+        self.diversity_weight = 5.0 # Reward for teams covering many different answers, used with "Diverse Teams"
+        self.seed = 0 # Seed of every generation, so the teams of a snapshot can be generated again
+
         # Initialize the program explanation label
         self.program_explanation = None
 
@@ -278,7 +292,7 @@ class GUI:
             self.attribute_labels[attribute] = label
 
             # Create BooleanVars for the homogenous and heterogenous attributes
-            is_homogeneous = attribute in self.data_processor.get_homogenous_attributes()
+            is_homogeneous = attribute in self.data_processor.get_scoring_config().homogenous
             checkbox_var = tk.BooleanVar(value = is_homogeneous)
 
             self.checkbox_vars[attribute] = checkbox_var
@@ -310,6 +324,12 @@ class GUI:
 
             self.create_emphasis_button(row_frame, row, 1, attribute)
 
+        # Identifiers, free text and empty columns start removed, they can be added again with their checkbutton
+        for attribute in self.data_processor.get_excluded_attributes():
+            if attribute in self.remove_checkbox_vars:
+                self.remove_checkbox_vars[attribute].set(False)
+                self.handle_remove_toggle(attribute)
+
         # Create a frame for the team sizing and drag and drop frame
         self.settings_frame = ttk.Frame(self.inner_frame, style = 'Scrollable.TFrame')
         self.settings_frame.grid(row = 0, column = 1, padx = 10, pady = 10, sticky = "ne")
@@ -433,10 +453,107 @@ class GUI:
         self.tooltip(self.min_teams_entry, "Teams will not be smaller than this size.\n"+
                      "If the desired team size is smaller than this, the minimum team size will be adjusted.", self.helvetica)
         
+        # Label for the planned team sizes, updated when the sizes change
+        self.team_plan_label = ttk.Label(self.settings_frame, text = "", font = (self.helvetica, 11), wraplength = 220)
+        self.team_plan_label.grid(row = 6, column = 0, columnspan = 2, padx = 5, pady = 5, sticky = tk.W)
+        self.update_team_plan_label()
+
+        # Checkbutton to optimize the worst team instead of the sum of all teams
+        self.balance_teams_var = tk.BooleanVar(value = False)
+
+        balance_teams_checkbutton = ttk.Checkbutton(
+            self.settings_frame,
+            text = "Balance Teams",
+            variable = self.balance_teams_var
+            )
+        balance_teams_checkbutton.grid(row = 7, column = 0, columnspan = 2, padx = 5, pady = 5, sticky = tk.W)
+        self.tooltip(balance_teams_checkbutton, "Raise the score of the weakest team, even if the overall score drops slightly.", self.helvetica)
+
+        # Checkbutton to reward teams that cover many different answers of the diverse attributes
+        self.diverse_teams_var = tk.BooleanVar(value = False)
+
+        diverse_teams_checkbutton = ttk.Checkbutton(
+            self.settings_frame,
+            text = "Diverse Teams",
+            variable = self.diverse_teams_var
+            )
+        diverse_teams_checkbutton.grid(row = 8, column = 0, columnspan = 2, padx = 5, pady = 5, sticky = tk.W)
+        self.tooltip(diverse_teams_checkbutton, "Prefer teams in which many different answers of the diverse attributes come together,\n"+
+                     "instead of only rewarding every pair of members with different answers.", self.helvetica)
+
+        # Checkbutton to start from the current teams and only improve them
+        self.keep_teams_var = tk.BooleanVar(value = False)
+
+        keep_teams_checkbutton = ttk.Checkbutton(
+            self.settings_frame,
+            text = "Keep Current Teams",
+            variable = self.keep_teams_var
+            )
+        keep_teams_checkbutton.grid(row = 9, column = 0, columnspan = 2, padx = 5, pady = 5, sticky = tk.W)
+        self.tooltip(keep_teams_checkbutton, "Improve the current teams with the new settings instead of forming them again.\n"+
+                     "Members are only moved if this clearly improves the teams.", self.helvetica)
+
+        # Checkbutton to match skill levels by their distance on the scale instead of exact equality
+        self.ordinal_skills_var = tk.BooleanVar(value = self.data_processor.get_scoring_config().ordinal)
+
+        ordinal_skills_checkbutton = ttk.Checkbutton(
+            self.settings_frame,
+            text = "Close Skill Levels Match",
+            variable = self.ordinal_skills_var,
+            command = lambda: self.data_processor.set_ordinal_skills(self.ordinal_skills_var.get())
+            )
+        ordinal_skills_checkbutton.grid(row = 10, column = 0, columnspan = 2, padx = 5, pady = 5, sticky = tk.W)
+        self.tooltip(ordinal_skills_checkbutton, "Count neighbouring skill levels, such as intermediate and advanced, as partly matching.\n"+
+                     "Unchecked, only identical skill levels match.", self.helvetica)
+
         # Label for the remaining members
         remaining_members = f"Remaining Members: "
         self.remaining_members_label = ttk.Label(self.settings_frame, text = remaining_members, font = (self.helvetica, 11))
-        self.remaining_members_label.grid(row = 6, column = 0, columnspan = 2, padx = 5, pady = 5, sticky = tk.W)
+        self.remaining_members_label.grid(row = 11, column = 0, columnspan = 2, padx = 5, pady = 5, sticky = tk.W)
+
+        # Button to add participants who registered after the teams were formed
+        late_arrivals_button = ttk.Button(
+            self.settings_frame,
+            text = "Add Late Arrivals",
+            style = 'Custom.TButton',
+            command = lambda: self.add_late_arrivals()
+            )
+        late_arrivals_button.grid(row = 12, column = 0, columnspan = 2, padx = 5, pady = 5, sticky = tk.W)
+        self.tooltip(late_arrivals_button, "Select a survey file with late registrations and place them into the current teams.\n"+
+                     "The other members stay in their teams.", self.helvetica)
+
+        # Button to compare the team sizes around the desired size before generating
+        compare_sizes_button = ttk.Button(
+            self.settings_frame,
+            text = "Compare Sizes",
+            style = 'Custom.TButton',
+            command = lambda: Comparison(self.root, self.data_processor, self, self.helvetica)
+            )
+        compare_sizes_button.grid(row = 13, column = 0, columnspan = 2, padx = 5, pady = 5, sticky = tk.W)
+        self.tooltip(compare_sizes_button, "Solve the teams for one member less and more than the desired size at once\n"+
+                     "and show the score, the worst team and the remaining members of every size.", self.helvetica)
+
+        # Button to assign the current teams to the preferred games of their members
+        assign_projects_button = ttk.Button(
+            self.settings_frame,
+            text = "Assign Projects",
+            style = 'Custom.TButton',
+            command = lambda: self.assign_projects()
+            )
+        assign_projects_button.grid(row = 14, column = 0, columnspan = 2, padx = 5, pady = 5, sticky = tk.W)
+        self.tooltip(assign_projects_button, "Assign every team to one of the games by the preferred games and challenges of its members.\n"+
+                     "Every game takes at most an even share of the teams.", self.helvetica)
+
+        # Button to restore the teams of the last generation from the snapshot
+        restore_teams_button = ttk.Button(
+            self.settings_frame,
+            text = "Restore Last Teams",
+            style = 'Custom.TButton',
+            command = lambda: self.restore_snapshot()
+            )
+        restore_teams_button.grid(row = 15, column = 0, columnspan = 2, padx = 5, pady = 5, sticky = tk.W)
+        self.tooltip(restore_teams_button, "Restore the teams and settings of the last generation without searching again.\n"+
+                     "Only possible while the same survey is loaded.", self.helvetica)
 
         # Bind the canvas to the mousewheel for scrolling
         self.canvas.bind_all("<MouseWheel>", self.on_mousewheel)
@@ -453,6 +570,8 @@ class GUI:
         self.bottom_frame.columnconfigure(2, weight = 1, minsize = 110)
         self.bottom_frame.columnconfigure(3, weight = 1, minsize = 110)
         self.bottom_frame.columnconfigure(4, weight = 1, minsize = 110)
+        self.bottom_frame.columnconfigure(5, weight = 1, minsize = 110)
+        self.bottom_frame.columnconfigure(6, weight = 1, minsize = 110)
 
         # Load the images for the buttons, first integer is width, second is height
         self.start_button = self.load_image("assets/images/generate.png", 110, 40)
@@ -508,9 +627,29 @@ class GUI:
             style = 'Buttonframe.TButton',
             command = lambda: Config(self.root, self.data_processor, self, self.helvetica)
             )
-        show_config_button.grid(row = 0, column = 4, padx = (10, 30), pady = 10, sticky = 'ew')
+        show_config_button.grid(row = 0, column = 4, padx = 10, pady = 10, sticky = 'ew')
         self.tooltip(show_config_button, "Show the current configuration of the data processor.", self.helvetica)
 
+        # Button to show the stage breakdown of the last run
+        show_performance_button = ttk.Button(
+            self.bottom_frame,
+            text = "Performance",
+            style = 'Buttonframe.TButton',
+            command = lambda: Performance(self.root, self.helvetica)
+            )
+        show_performance_button.grid(row = 0, column = 5, padx = (10, 10), pady = 10, sticky = 'ew')
+        self.tooltip(show_performance_button, "Show the timings of the last survey load and team generation.", self.helvetica)
+
+        # Button to pin members to teams and keep members apart
+        show_overrides_button = ttk.Button(
+            self.bottom_frame,
+            text = "Overrides",
+            style = 'Buttonframe.TButton',
+            command = lambda: Overrides(self.root, self.data_processor, self.teamforming, self, self.helvetica)
+            )
+        show_overrides_button.grid(row = 0, column = 6, padx = (10, 30), pady = 10, sticky = 'ew')
+        self.tooltip(show_overrides_button, "Pin members to the current teams or keep members apart and re-solve only the other members.", self.helvetica)
+
     def create_checkbutton(self, row, attribute):
         # Create BooleanVar for the Checkbutton
         self.checkbox_vars[attribute] = tk.BooleanVar(value = True)
@@ -589,12 +728,35 @@ class GUI:
 
             if min_size > 0 and max_size > 0 and desired_size > 0:
                 self.generate_button.config(state = tk.NORMAL)
+                self.update_team_plan_label()
             else:
                 self.generate_button.config(state = tk.DISABLED)
 
         except:
             self.generate_button.config(state = tk.DISABLED)
 
+    # Method to show the planned team sizes for the current size entries before generating
+    def update_team_plan_label(self):
+        try:
+            total_members = len(self.data_processor.get_data())
+            sizes = TeamForming.adjust_team_sizes(
+                total_members,
+                int(self.team_size_var.get()),
+                int(self.min_team_size_var.get()),
+                int(self.max_team_size_var.get())
+                )
+            planned_sizes = TeamForming.plan_team_sizes(total_members, *sizes)
+            remaining_members = total_members - sum(planned_sizes)
+
+            plan = f"Plan: {TeamForming.format_team_plan(planned_sizes)}"
+            if remaining_members:
+                plan += f" ({remaining_members} remaining)"
+
+            self.team_plan_label.config(text = plan)
+
+        except (ValueError, AttributeError):
+            pass
+
     # Method to validate the size entries by checking if they are positive integers
     def validate_size(self, size, action, entry_name):
         entry_widget = self.root.nametowidget(entry_name)
@@ -873,23 +1035,139 @@ class GUI:
                     self.feedback_labels.clear()
 
             # Generate teams based on the desired team size, minimum team size, and maximum team size
-            self.teams, remaining_members = self.teamforming.generate_teams(desired_size, min_size, max_size)
-            self.teamforming.set_teams(self.teams)  # Set teams attribute
-            self.update_remaining_members_label(len(remaining_members))
-
-            # Create buttons to visualize the teams
-            for idx, team in enumerate(self.teams):
-                button = ttk.Button(
-                    self.team_buttons_frame,
-                    style = 'Toggle.TButton',
-                    text = f"Visualize Team {idx + 1}",
-                    command = lambda t=team: self.visualize_teams(t)
+            objective = 'balanced' if self.balance_teams_var.get() else 'sum'
+            diversity_weight = self.diversity_weight if self.diverse_teams_var.get() else None
+
+            # Improve the current teams with the new settings or generate new teams
+            if self.keep_teams_var.get() and self.teamforming.teams:
+                self.teams, remaining_members = self.teamforming.regenerate_teams(
+                    min_size, max_size, self.stability_penalty, objective = objective, diversity_weight = diversity_weight, seed = self.seed
+                    )
+            else:
+                self.teams, remaining_members = self.result_cache.generate_teams(
+                    self.teamforming, desired_size, min_size, max_size, objective = objective, diversity_weight = diversity_weight, seed = self.seed
                     )
-                button.pack(fill = "x", padx = (5, 10), pady = 10)
+
+                # Apply the pinned members and forbidden pairs to the new teams
+                if self.teamforming.pinned or self.teamforming.forbidden:
+                    self.teamforming.set_teams(self.teams)
+                    self.teams, remaining_members = self.teamforming.regenerate_teams(
+                        min_size, max_size, objective = objective, diversity_weight = diversity_weight, seed = self.seed
+                        )
+
+            self.show_teams(remaining_members)
 
         except Exception as e:
             print(f"Error generating teams: {e}")
 
+    # Method to re-solve the current teams with the pinned members and forbidden pairs of the Overrides window
+    def apply_overrides(self):
+        try:
+            if not self.teamforming.teams:
+                print("Error applying overrides: generate teams first")
+                return
+
+            # Clear the team buttons frame
+            for widget in self.team_buttons_frame.winfo_children():
+                widget.destroy()
+
+            min_size = int(self.min_team_size_var.get())
+            max_size = int(self.max_team_size_var.get())
+            objective = 'balanced' if self.balance_teams_var.get() else 'sum'
+            diversity_weight = self.diversity_weight if self.diverse_teams_var.get() else None
+
+            self.teams, remaining_members = self.teamforming.regenerate_teams(
+                min_size, max_size, self.stability_penalty, objective = objective, diversity_weight = diversity_weight, seed = self.seed
+                )
+            self.show_teams(remaining_members)
+
+        except Exception as e:
+            print(f"Error applying overrides: {e}")
+
+    # Method to append late registrations to the survey and insert them into the current teams
+    def add_late_arrivals(self):
+        try:
+            filepath = select_file()
+            if filepath and filepath.endswith('.csv'):
+                new_members = self.data_processor.append_survey(filepath)
+                self.member_descriptive_label.config(text = f"Total Members: {len(self.data_processor.get_data())}")
+                self.update_team_plan_label()
+
+                if not self.teamforming.teams:
+                    return
+
+                # Clear the team buttons frame
+                for widget in self.team_buttons_frame.winfo_children():
+                    widget.destroy()
+
+                self.teams, remaining_members = self.teamforming.insert_members(new_members, int(self.max_team_size_var.get()))
+                self.show_teams(remaining_members)
+
+        except Exception as e:
+            print(f"Error adding late arrivals: {e}")
+
+    # Method to assign the current teams to projects and show the project of every team on its button
+    def assign_projects(self):
+        try:
+            if not self.teams:
+                return
+
+            projects = ProjectAssignment(self.data_processor).assign(self.teams)
+
+            for button, project in zip(self.team_buttons_frame.winfo_children(), projects):
+                if project is not None:
+                    button.config(text = f"{button.cget('text').split(' - ')[0]} - {project}")
+
+        except Exception as e:
+            print(f"Error assigning projects: {e}")
+
+    # Method to restore the teams and settings of the last generation from the snapshot
+    def restore_snapshot(self):
+        try:
+            snapshot = Snapshot.load(Snapshot.SNAPSHOT_FILE)
+            self.teams, remaining_members = snapshot.restore(self.data_processor, self.teamforming)
+
+            # Rebuild the settings from the restored configuration and show the sizes of the snapshot
+            self.update_gui()
+
+            if snapshot.data['sizes']:
+                desired_size, min_size, max_size = snapshot.data['sizes']
+
+                # Re-solved teams have no desired size, the median size of the restored teams is shown instead
+                if desired_size is None and self.teams:
+                    desired_size = sorted(len(team) for team in self.teams)[len(self.teams) // 2]
+
+                for variable, size in ((self.team_size_var, desired_size), (self.min_team_size_var, min_size), (self.max_team_size_var, max_size)):
+                    if size is not None:
+                        variable.set(str(size))
+
+            # Generate again with the seed of the snapshot
+            if snapshot.data.get('seed') is not None:
+                self.seed = snapshot.data['seed']
+
+            self.show_teams(remaining_members)
+
+        except (OSError, ValueError) as e:
+            print(f"Error restoring the last teams: {e}")
+
+    # Method to keep the generated teams and create the buttons to visualize them
+    def show_teams(self, remaining_members):
+        self.teamforming.set_teams(self.teams)  # Set teams attribute
+        self.update_remaining_members_label(len(remaining_members))
+
+        # Keep a snapshot of the result, so the same teams can be restored without generating again
+        Snapshot.capture(self.data_processor, self.teamforming, remaining_members).save(Snapshot.SNAPSHOT_FILE)
+
+        # Create buttons to visualize the teams
+        for idx, team in enumerate(self.teams):
+            button = ttk.Button(
+                self.team_buttons_frame,
+                style = 'Toggle.TButton',
+                text = f"Visualize Team {idx + 1}",
+                command = lambda t=team: self.visualize_teams(t)
+                )
+            button.pack(fill = "x", padx = (5, 10), pady = 10)
+
     # Method to visualize teams in the Visualization class
     def visualize_teams(self, team):
         try:
@@ -0,0 +1,535 @@
+import time
+import numpy as np
+from src.profiler import profiler
+
+"""
+    The TeamState and LocalSearch classes improve already formed teams by moving single members and swapping pairs of
+    members between teams, until no improving move remains or the time budget is used up.
+
+    Key Responsibilities:
+    - Keep the teams, the team of every member, the team sizes and the total score of every team.
+    - Cache for every member the summed compatibility with every team, so the gain of a move or swap is read in O(1)
+      and applying it only updates two columns of the cache.
+    - Search the best move or swap of every member, keeping the planned team sizes and optionally the skill balance
+      band of the SkillBalance, the team diversity of the TeamDiversity, the required roles of the RoleCoverage and a
+      penalty for moving members out of the team they started in.
+    - Report the number of tried and applied moves and the improvement of the objective.
+
+    The objective is the same as in TeamForming: the sum of the individual scores and the pairwise compatibility scores
+    within every team. Members that are not assigned to a team are left untouched.
+
+    Moving a member from a smaller into a larger team always adds more pairs than it removes, so free moves would drift
+    the teams to the minimum and maximum size. A member therefore only moves from a team of size s into a team of size
+    s - 1, which exchanges the sizes of the two teams and keeps the planned size of every team.
+"""
+
+# Teams the member may move to without changing the planned team sizes, the two teams exchange their sizes
+def size_neutral_targets(sizes, source):
+    return sizes == sizes[source] - 1
+
+class TeamState:
+    def __init__(self, teams, individual_scores, compatibility_matrix):
+        self.individual_scores = np.asarray(individual_scores, dtype = float)
+        self.compatibility_matrix = np.asarray(compatibility_matrix, dtype = float)
+        self.teams = [list(team) for team in teams]
+
+        total_members = len(self.individual_scores)
+        self.labels = np.full(total_members, -1) # Team index of every member, -1 for unassigned members
+        self.sizes = np.array([len(team) for team in self.teams], dtype = int)
+
+        # Summed compatibility of every member with the members of every team: members x teams
+        self.sums = np.zeros((total_members, len(self.teams)))
+
+        for index, team in enumerate(self.teams):
+            self.labels[team] = index
+            self.sums[:, index] = self.compatibility_matrix[:, team].sum(axis = 1)
+
+        # Summed individual scores and total score of every team, kept up to date by every move
+        self.skill_sums = np.array([self.individual_scores[team].sum() for team in self.teams], dtype = float)
+        self.totals = np.array([self.team_score(index) for index in range(len(self.teams))], dtype = float)
+
+    def move_gain(self, member, target):
+        # Change of the objective when the member moves to the target team
+        return self.sums[member, target] - self.sums[member, self.labels[member]]
+
+    def swap_gain(self, member, other_member):
+        # Change of the objective when the two members swap their teams
+        team, other_team = self.labels[member], self.labels[other_member]
+
+        return (self.sums[member, other_team] - self.sums[member, team]
+                + self.sums[other_member, team] - self.sums[other_member, other_team]
+                - 2 * self.compatibility_matrix[member, other_member])
+
+    def move(self, member, target):
+        source = self.labels[member]
+
+        self.teams[source].remove(member)
+        self.teams[target].append(member)
+        self.labels[member] = target
+        self.sizes[source] -= 1
+        self.sizes[target] += 1
+        self.skill_sums[source] -= self.individual_scores[member]
+        self.skill_sums[target] += self.individual_scores[member]
+        self.totals[source] -= self.individual_scores[member] + self.sums[member, source]
+        self.totals[target] += self.individual_scores[member] + self.sums[member, target]
+
+        # Only the columns of the two teams change
+        self.sums[:, source] -= self.compatibility_matrix[:, member]
+        self.sums[:, target] += self.compatibility_matrix[:, member]
+
+    def swap(self, member, other_member):
+        team, other_team = self.labels[member], self.labels[other_member]
+        self.move(member, other_team)
+        self.move(other_member, team)
+
+    def team_score(self, index):
+        # Total score of a team like TeamForming.calculate_total_scores
+        team = self.teams[index]
+        return self.individual_scores[team].sum() + self.sums[team, index].sum() / 2
+
+    def objective(self):
+        return sum(self.team_score(index) for index in range(len(self.teams)))
+
+class SkillBalance:
+    # Keep the summed individual scores of every team within a band of the given tolerance around the cohort mean
+    def __init__(self, individual_scores, tolerance = 0.1, hard = False, penalty = 5.0):
+        individual_scores = np.asarray(individual_scores, dtype = float)
+        self.mean = float(individual_scores.mean()) if len(individual_scores) else 0.0
+        self.tolerance = tolerance
+        self.hard = hard
+        self.penalty = penalty
+
+        # Moves back towards a hard band get a large reward, so repairs win over the objective
+        self.repair_weight = np.abs(individual_scores).sum() * 4 + 1
+
+    # Amount by which teams with the given skill sums and sizes lie outside the band, scaled to the team size
+    def violation(self, skill_sums, sizes):
+        target = self.mean * np.asarray(sizes, dtype = float)
+        return np.maximum(np.abs(np.asarray(skill_sums) - target) - self.tolerance * np.abs(target), 0)
+
+    # Penalty of moving the member to every team
+    def move_penalty(self, state, member, source):
+        score = state.individual_scores[member]
+        source_change = (self.violation(state.skill_sums[source] - score, state.sizes[source] - 1)
+                         - self.violation(state.skill_sums[source], state.sizes[source]))
+        target_change = self.violation(state.skill_sums + score, state.sizes + 1) - self.violation(state.skill_sums, state.sizes)
+
+        return self.weigh(source_change + target_change)
+
+    # Penalty of swapping the member with every member of the others
+    def swap_penalty(self, state, member, team, others, other_teams):
+        difference = state.individual_scores[others] - state.individual_scores[member]
+        team_change = (self.violation(state.skill_sums[team] + difference, state.sizes[team])
+                       - self.violation(state.skill_sums[team], state.sizes[team]))
+        other_change = (self.violation(state.skill_sums[other_teams] - difference, state.sizes[other_teams])
+                        - self.violation(state.skill_sums[other_teams], state.sizes[other_teams]))
+
+        return self.weigh(team_change + other_change)
+
+    # Turn changes of the violation into penalties, a hard band forbids every move that increases the violation
+    def weigh(self, changes):
+        if self.hard:
+            return np.where(changes > 1e-9, np.inf, changes * self.repair_weight)
+
+        return self.penalty * changes
+
+    def total_violation(self, state):
+        return float(self.violation(state.skill_sums, state.sizes).sum())
+
+# c · log(c) of answer counts, the building block of the entropy of a team
+def count_entropy_terms(counts):
+    counts = np.asarray(counts, dtype = float)
+    return counts * np.log(np.maximum(counts, 1))
+
+class TeamDiversity:
+    # Reward teams that cover many different answers of the given attributes, measured per team as the number of distinct
+    # answers (coverage) or the summed entropy of the answers of every attribute (entropy)
+    def __init__(self, codes, weight = 5.0, measure = 'entropy'):
+        if measure not in ('coverage', 'entropy'):
+            raise ValueError(f"Unknown diversity measure: {measure}")
+
+        self.weight = weight
+        self.measure = measure
+        self.attributes = len(codes)
+
+        # Every answer of every attribute gets its own column of the count vectors, missing answers count as an answer
+        columns = []
+        self.total_values = 0
+
+        for attribute_codes in codes:
+            attribute_codes = np.asarray(attribute_codes, dtype = int)
+            attribute_codes = np.where(attribute_codes < 0, attribute_codes.max(initial = -1) + 1, attribute_codes)
+            columns.append(attribute_codes + self.total_values)
+            self.total_values += int(attribute_codes.max(initial = -1)) + 1
+
+        self.indices = np.column_stack(columns) if columns else None # members x attributes
+
+    # Count the answers of every team, called by the LocalSearch before the search starts
+    def reset(self, state):
+        if self.indices is None:
+            self.indices = np.zeros((len(state.labels), 0), dtype = int)
+
+        # Answer counts of every team: teams x answers
+        self.counts = np.zeros((len(state.teams), self.total_values), dtype = int)
+
+        for index, team in enumerate(state.teams):
+            np.add.at(self.counts[index], self.indices[team].ravel(), 1)
+
+        if self.measure == 'coverage':
+            # A count of 0 gains an answer when a member joins, a count of 1 loses it when the member leaves
+            self.added = np.zeros(len(state.labels) + 2)
+            self.added[0] = 1
+            self.removed = np.zeros(len(state.labels) + 2)
+            self.removed[1] = -1
+            self.terms = (self.counts > 0).sum(axis = 1).astype(float)
+        else:
+            # Change of c · log(c) when a count rises or falls by one, looked up instead of calculated per move
+            entropy_terms = count_entropy_terms(np.arange(len(state.labels) + 2))
+            self.added = np.append(np.diff(entropy_terms), 0)
+            self.removed = np.append(0, -np.diff(entropy_terms))
+            self.terms = count_entropy_terms(self.counts).sum(axis = 1)
+
+        self.values = self.team_values(state.sizes, self.terms)
+
+    # Value of teams with the given sizes and summed terms, the number of covered answers or the summed entropy
+    def team_values(self, sizes, terms):
+        if self.measure == 'coverage':
+            return terms
+
+        # Entropy of every attribute is log(size) - sum(c · log(c)) / size, summed over the attributes
+        sizes = np.maximum(np.asarray(sizes, dtype = float), 1)
+        return self.attributes * np.log(sizes) - terms / sizes
+
+    # Reward of moving the member to every team, calculated in O(attributes) per team
+    def move_gains(self, state, member, source):
+        answers = self.indices[member]
+
+        target_values = self.team_values(state.sizes + 1, self.terms + self.added[self.counts[:, answers]].sum(axis = 1))
+        source_value = self.team_values(state.sizes[source] - 1, self.terms[source] + self.removed[self.counts[source, answers]].sum())
+
+        return self.weight * (target_values - self.values + source_value - self.values[source])
+
+    # Reward of swapping the member with every member of the others, answers both members share change nothing
+    def swap_gains(self, state, member, team, others, other_teams):
+        answers = self.indices[member]
+        other_answers = self.indices[others]
+        differs = other_answers != answers[None, :]
+
+        # The team of the member loses its answers and gains the answers of the other member, and the other way around
+        team_changes = self.removed[self.counts[team, answers]][None, :] + self.added[self.counts[team, other_answers]]
+        other_changes = (self.removed[self.counts[other_teams[:, None], other_answers]]
+                         + self.added[self.counts[other_teams[:, None], answers[None, :]]])
+
+        team_values = self.team_values(state.sizes[team], self.terms[team] + (team_changes * differs).sum(axis = 1))
+        other_values = self.team_values(state.sizes[other_teams], self.terms[other_teams] + (other_changes * differs).sum(axis = 1))
+
+        return self.weight * (team_values - self.values[team] + other_values - self.values[other_teams])
+
+    # Update the count vectors of the two teams after the state moved the member, in O(attributes)
+    def move(self, state, member, source, target):
+        answers = self.indices[member]
+
+        self.terms[source] += self.removed[self.counts[source, answers]].sum()
+        self.terms[target] += self.added[self.counts[target, answers]].sum()
+        self.counts[source, answers] -= 1
+        self.counts[target, answers] += 1
+
+        for team in (source, target):
+            self.values[team] = self.team_values(state.sizes[team], self.terms[team])
+
+    def total(self):
+        return float(self.values.sum())
+
+class RoleCoverage:
+    # Require at least a minimum number of members with a role in every team, for example one member familiar with git.
+    # Roles is a roles x members boolean matrix, minimums holds the required number of members of every role
+    def __init__(self, roles, minimums):
+        self.roles = np.asarray(roles, dtype = bool).reshape(len(minimums), -1)
+        self.minimums = np.asarray(minimums, dtype = int)
+
+    # Count the members of every role in every team, called by the LocalSearch before the search starts
+    def reset(self, state):
+        self.counts = np.zeros((len(self.minimums), len(state.teams)), dtype = int)
+
+        for index, team in enumerate(state.teams):
+            self.counts[:, index] = self.roles[:, team].sum(axis = 1)
+
+        # Moves that fill a missing role get a reward above any change of the objective, so repairs always win
+        self.repair_weight = 4 * (np.abs(state.compatibility_matrix).sum(axis = 1).max(initial = 0) + np.abs(state.individual_scores).max(initial = 0)) + 1
+
+    # Penalty of moving the member to every team, moves that leave a role missing in the source team are forbidden even
+    # if they fill the role in the target team
+    def move_penalty(self, state, member, source):
+        roles = self.roles[:, member]
+
+        if not roles.any():
+            return np.zeros(len(state.teams))
+
+        source_loss = (roles & (self.counts[:, source] <= self.minimums)).sum()
+        target_gain = (roles[:, None] & (self.counts < self.minimums[:, None])).sum(axis = 0)
+
+        return self.weigh(np.full(len(state.teams), source_loss), target_gain)
+
+    # Penalty of swapping the member with every member of the others, swaps of members with the same roles change nothing
+    def swap_penalty(self, state, member, team, others, other_teams):
+        # Change of the role counts of the team of the member: roles x others
+        difference = self.roles[:, others].astype(int) - self.roles[:, member][:, None]
+        minimums = self.minimums[:, None]
+
+        team_counts = self.counts[:, team][:, None]
+        other_counts = self.counts[:, other_teams]
+
+        losses = ((difference < 0) & (team_counts <= minimums)).sum(axis = 0) + ((difference > 0) & (other_counts <= minimums)).sum(axis = 0)
+        gains = ((difference > 0) & (team_counts < minimums)).sum(axis = 0) + ((difference < 0) & (other_counts < minimums)).sum(axis = 0)
+
+        return self.weigh(losses, gains)
+
+    # Every role left missing in a team forbids the change, every filled role is rewarded
+    def weigh(self, losses, gains):
+        return np.where(losses > 0, np.inf, -gains * self.repair_weight)
+
+    # Update the counters of the two teams after the state moved the member, in O(roles)
+    def move(self, state, member, source, target):
+        roles = self.roles[:, member]
+        self.counts[roles, source] -= 1
+        self.counts[roles, target] += 1
+
+    # Number of missing role members over all teams
+    def total_violation(self):
+        return int(np.maximum(self.minimums[:, None] - self.counts, 0).sum())
+
+class LocalSearch:
+    EPSILON = 1e-9 # Minimum gain of an applied move, avoids cycling on rounding errors
+
+    def __init__(self, state, min_size, max_size, time_budget = None, skill_balance = None, stability_penalty = 0.0,
+                 fixed = None, forbidden = None, diversity = None, role_coverage = None, max_passes = None):
+        self.state = state
+        self.min_size = min_size
+        self.max_size = max_size
+        self.time_budget = time_budget
+        self.max_passes = max_passes # Budget independent of the machine speed, used for reproducible runs
+        self.skill_balance = skill_balance
+
+        # Team level diversity reward, its count vectors follow every move of the search
+        self.diversity = diversity
+
+        if diversity is not None:
+            diversity.reset(state)
+
+        # Required roles of every team, moves that leave a role missing are rejected
+        self.role_coverage = role_coverage
+
+        if role_coverage is not None:
+            role_coverage.reset(state)
+
+        # Penalty for moving a member out of the team it started in, keeps already announced teams stable
+        self.stability_penalty = stability_penalty
+        self.home_labels = state.labels.copy()
+
+        # Pinned members never move, forbidden maps a member to the members it must not share a team with
+        self.fixed = np.zeros(len(state.labels), dtype = bool) if fixed is None else np.asarray(fixed, dtype = bool)
+        self.forbidden = {member: np.array(partners, dtype = int) for member, partners in (forbidden or {}).items()}
+
+    def move(self, member, target):
+        source = self.state.labels[member]
+        self.state.move(member, target)
+
+        if self.diversity is not None:
+            self.diversity.move(self.state, member, source, target)
+
+        if self.role_coverage is not None:
+            self.role_coverage.move(self.state, member, source, target)
+
+    def swap(self, member, other_member):
+        team, other_team = self.state.labels[member], self.state.labels[other_member]
+        self.move(member, other_team)
+        self.move(other_member, team)
+
+    # Teams of the forbidden partners of the member, optionally leaving out one partner
+    def blocked_teams(self, member, exclude = None):
+        partners = self.forbidden.get(member)
+
+        if partners is None:
+            return np.array([], dtype = int)
+
+        if exclude is not None:
+            partners = partners[partners != exclude]
+
+        teams = self.state.labels[partners]
+        return teams[teams >= 0]
+
+    # Find the best single move of the member, returns the gain and the target team
+    def best_move(self, member):
+        state = self.state
+        source = state.labels[member]
+
+        if state.sizes[source] <= self.min_size or self.fixed[member]:
+            return -np.inf, None
+
+        gains = state.sums[member] - state.sums[member, source]
+
+        if self.skill_balance is not None:
+            gains -= self.skill_balance.move_penalty(state, member, source)
+
+        if self.diversity is not None:
+            gains += self.diversity.move_gains(state, member, source)
+
+        if self.role_coverage is not None:
+            gains -= self.role_coverage.move_penalty(state, member, source)
+
+        if self.stability_penalty:
+            home = self.home_labels[member]
+            gains += self.stability_penalty * ((np.arange(len(gains)) == home).astype(float) - (source == home))
+
+        gains[~size_neutral_targets(state.sizes, source) | (state.sizes >= self.max_size)] = -np.inf
+        gains[self.blocked_teams(member)] = -np.inf
+        gains[source] = -np.inf
+        target = int(np.argmax(gains))
+
+        return gains[target], target
+
+    # Find the best swap of the member with a member of another team, returns the gain and the other member
+    def best_swap(self, member, assigned_members):
+        state = self.state
+        team = state.labels[member]
+        others = assigned_members[(state.labels[assigned_members] != team) & ~self.fixed[assigned_members]]
+
+        if self.fixed[member] or not len(others):
+            return -np.inf, None
+
+        other_teams = state.labels[others]
+        gains = (state.sums[member, other_teams] - state.sums[member, team]
+                 + state.sums[others, team] - state.sums[others, other_teams]
+                 - 2 * state.compatibility_matrix[member, others])
+
+        if self.skill_balance is not None:
+            gains -= self.skill_balance.swap_penalty(state, member, team, others, other_teams)
+
+        if self.diversity is not None:
+            gains += self.diversity.swap_gains(state, member, team, others, other_teams)
+
+        if self.role_coverage is not None:
+            gains -= self.role_coverage.swap_penalty(state, member, team, others, other_teams)
+
+        if self.stability_penalty:
+            home, other_homes = self.home_labels[member], self.home_labels[others]
+            gains += self.stability_penalty * ((other_teams == home).astype(float) - (team == home)
+                                               + (team == other_homes) - (other_teams == other_homes))
+
+        if self.forbidden:
+            gains[np.isin(other_teams, self.blocked_teams(member))] = -np.inf
+
+            # Members with forbidden partners in the team of the member can not swap into it
+            for other_member in self.forbidden:
+                index = np.searchsorted(others, other_member)
+
+                if index < len(others) and others[index] == other_member and team in self.blocked_teams(other_member, member):
+                    gains[index] = -np.inf
+
+        best = int(np.argmax(gains))
+
+        return gains[best], int(others[best])
+
+    # Move free members away from forbidden partners in their team, into the allowed team with room and the highest gain,
+    # or swap them with a free member of an allowed team. Returns the number of forbidden pairs that still share a team
+    def separate(self):
+        state = self.state
+
+        for member in self.forbidden:
+            source = state.labels[member]
+
+            if source < 0 or self.fixed[member] or source not in self.blocked_teams(member):
+                continue
+
+            gains = state.sums[member] - state.sums[member, source]
+            gains[~size_neutral_targets(state.sizes, source) | (state.sizes >= self.max_size)] = -np.inf
+            gains[self.blocked_teams(member)] = -np.inf
+
+            if state.sizes[source] > self.min_size and np.isfinite(gains.max()):
+                self.move(member, int(np.argmax(gains)))
+                continue
+
+            # The source team is at the minimum size or no move keeps the team sizes, exchange the member with a free member
+            # of an allowed team that may join the source team
+            candidates = [other for other in np.flatnonzero(state.labels >= 0)
+                          if state.labels[other] != source and not self.fixed[other]
+                          and state.labels[other] not in self.blocked_teams(member)
+                          and source not in self.blocked_teams(other, exclude = member)]
+
+            if candidates:
+                self.swap(member, max(candidates, key = lambda other: state.swap_gain(member, other)))
+
+        return self.unresolved_pairs()
+
+    # Number of forbidden pairs that still share a team
+    def unresolved_pairs(self):
+        state = self.state
+        return sum(int(state.labels[member] >= 0 and state.labels[member] in self.blocked_teams(member)) for member in self.forbidden) // 2
+
+    # Apply the best improving move or swap of every member until a full pass finds no improvement
+    def run(self):
+        state = self.state
+        started = time.perf_counter()
+        start_objective = state.objective()
+        assigned_members = np.flatnonzero(state.labels >= 0)
+
+        moves_tried = 0
+        moves_applied = 0
+        passes = 0
+        improved = True
+        complete = True
+
+        while improved:
+            if self.max_passes is not None and passes >= self.max_passes:
+                complete = False
+                break
+
+            improved = False
+            passes += 1
+
+            # Pinned members are left out, so a re-solve only touches the free members
+            for member in assigned_members[~self.fixed[assigned_members]].tolist():
+                if self.time_budget is not None and time.perf_counter() - started > self.time_budget:
+                    improved = False
+                    complete = False
+                    break
+
+                move_gain, target = self.best_move(member)
+                swap_gain, other_member = self.best_swap(member, assigned_members)
+                moves_tried += len(state.teams) + len(assigned_members)
+
+                if max(move_gain, swap_gain) <= self.EPSILON:
+                    continue
+
+                if move_gain >= swap_gain:
+                    self.move(member, target)
+                else:
+                    self.swap(member, other_member)
+
+                moves_applied += 1
+                improved = True
+
+        profiler.count('moves_tried', moves_tried)
+        profiler.count('moves_applied', moves_applied)
+
+        report = {
+            'passes': passes,
+            'moves_tried': moves_tried,
+            'moves_applied': moves_applied,
+            'improvement': float(state.objective() - start_objective),
+            'complete': complete, # False when the time or pass budget stopped the search
+            'seconds': time.perf_counter() - started
+        }
+
+        if self.skill_balance is not None:
+            report['skill_violation'] = self.skill_balance.total_violation(state)
+
+        if self.diversity is not None:
+            report['diversity'] = self.diversity.total()
+
+        if self.role_coverage is not None:
+            report['missing_roles'] = self.role_coverage.total_violation()
+
+        report['members_moved'] = int((state.labels != self.home_labels).sum())
+
+        return report
@@ -0,0 +1,116 @@
+import tkinter as tk
+from tkinter import ttk
+
+"""
+    The Overrides class is responsible for the manual pin and forbid controls of the Group Former application.
+    It creates a new window using the tkinter library to pin members to teams and keep pairs of members apart.
+
+    Key Responsibilities:
+    - Initialize the overrides window and configure its appearance.
+    - Pin a member to one of the current teams or keep two members apart.
+    - List the current overrides and remove selected ones.
+    - Re-solve the teams through the GUI, which only moves the members that are not pinned.
+"""
+
+class Overrides:
+    def __init__(self, root, data_processor, teamforming, gui, font_settings):
+        self.root = root
+        self.data_processor = data_processor
+        self.teamforming = teamforming
+        self.gui = gui
+        self.font_settings = font_settings
+        self.main_color = '#6f12c0'
+
+        # Display names of the members, with the index to keep equal names apart
+        df = self.data_processor.get_data()
+        names = df['Name'] if 'Name' in df.columns else df.index
+        self.members = {f"{name} ({member})": member for member, name in zip(df.index, names)}
+
+        self.create_overrides_window()
+
+    # Create the overrides window with the pin and forbid controls and the list of current overrides
+    def create_overrides_window(self):
+        self.overrides_window = tk.Toplevel(self.root)
+        self.overrides_window.title("Overrides")
+        self.overrides_window.geometry("460x420")
+
+        font_settings = (self.font_settings, 11)
+        frame = ttk.Frame(self.overrides_window, padding = "3 3 12 12")
+        frame.pack(fill = "both", expand = True)
+
+        member_names = list(self.members)
+        team_names = [f"Team {index + 1}" for index in range(len(self.teamforming.teams))]
+
+        # Pin a member to a team
+        ttk.Label(frame, text = "Pin Member:", foreground = self.main_color, font = font_settings).grid(row = 0, column = 0, columnspan = 3, padx = 10, pady = 5, sticky = tk.W)
+
+        self.pin_member_var = tk.StringVar()
+        ttk.Combobox(frame, textvariable = self.pin_member_var, values = member_names, width = 24, state = 'readonly').grid(row = 1, column = 0, padx = 10, pady = 5)
+
+        self.pin_team_var = tk.StringVar()
+        ttk.Combobox(frame, textvariable = self.pin_team_var, values = team_names, width = 10, state = 'readonly').grid(row = 1, column = 1, padx = 5, pady = 5)
+
+        ttk.Button(frame, text = "Pin", style = 'Custom.TButton', command = self.pin_member).grid(row = 1, column = 2, padx = 5, pady = 5)
+
+        # Keep two members apart
+        ttk.Label(frame, text = "Keep Apart:", foreground = self.main_color, font = font_settings).grid(row = 2, column = 0, columnspan = 3, padx = 10, pady = 5, sticky = tk.W)
+
+        self.forbid_member_var = tk.StringVar()
+        ttk.Combobox(frame, textvariable = self.forbid_member_var, values = member_names, width = 24, state = 'readonly').grid(row = 3, column = 0, padx = 10, pady = 5)
+
+        self.forbid_other_var = tk.StringVar()
+        ttk.Combobox(frame, textvariable = self.forbid_other_var, values = member_names, width = 24, state = 'readonly').grid(row = 4, column = 0, padx = 10, pady = 5)
+
+        ttk.Button(frame, text = "Forbid", style = 'Custom.TButton', command = self.forbid_pair).grid(row = 4, column = 2, padx = 5, pady = 5)
+
+        # Current overrides
+        ttk.Label(frame, text = "Current Overrides:", foreground = self.main_color, font = font_settings).grid(row = 5, column = 0, columnspan = 3, padx = 10, pady = 5, sticky = tk.W)
+
+        self.overrides_listbox = tk.Listbox(frame, height = 8, width = 50, font = font_settings)
+        self.overrides_listbox.grid(row = 6, column = 0, columnspan = 3, padx = 10, pady = 5)
+
+        ttk.Button(frame, text = "Remove", style = 'Custom.TButton', command = self.remove_override).grid(row = 7, column = 0, padx = 10, pady = 5, sticky = tk.W)
+        ttk.Button(frame, text = "Apply", style = 'Custom.TButton', command = self.apply_overrides).grid(row = 7, column = 2, padx = 5, pady = 5)
+
+        self.show_overrides()
+
+    # Display the pinned members and forbidden pairs, the entries keep the order used by remove_override
+    def show_overrides(self):
+        names = {member: name for name, member in self.members.items()}
+        self.entries = []
+        self.overrides_listbox.delete(0, tk.END)
+
+        for member, team_index in self.teamforming.pinned.items():
+            self.entries.append(('pin', member))
+            self.overrides_listbox.insert(tk.END, f"{names.get(member, member)} in Team {team_index + 1}")
+
+        for pair in self.teamforming.forbidden:
+            member, other_member = sorted(pair)
+            self.entries.append(('forbid', (member, other_member)))
+            self.overrides_listbox.insert(tk.END, f"{names.get(member, member)} apart from {names.get(other_member, other_member)}")
+
+    def pin_member(self):
+        if self.pin_member_var.get() and self.pin_team_var.get():
+            team_index = int(self.pin_team_var.get().split()[-1]) - 1
+            self.teamforming.pin_member(self.members[self.pin_member_var.get()], team_index)
+            self.show_overrides()
+
+    def forbid_pair(self):
+        if self.forbid_member_var.get() and self.forbid_other_var.get():
+            self.teamforming.forbid_pair(self.members[self.forbid_member_var.get()], self.members[self.forbid_other_var.get()])
+            self.show_overrides()
+
+    def remove_override(self):
+        for index in self.overrides_listbox.curselection():
+            kind, value = self.entries[index]
+
+            if kind == 'pin':
+                self.teamforming.unpin_member(value)
+            else:
+                self.teamforming.allow_pair(*value)
+
+        self.show_overrides()
+
+    # Re-solve the current teams with the overrides, only the members that are not pinned are moved
+    def apply_overrides(self):
+        self.gui.apply_overrides()
@@ -0,0 +1,69 @@
+import tkinter as tk
+from tkinter import ttk
+from src.profiler import profiler
+
+"""
+    The Performance class is responsible for displaying the stage breakdown of the last run of the Group Former application.
+    It creates a new window using the tkinter library to show the timings and counters collected by the profiler.
+
+    Key Responsibilities:
+    - Initialize the performance window and configure its appearance.
+    - Display the duration, share and number of calls of every profiled stage.
+    - Display the counters such as scored candidates, cache hits and tried moves.
+    - Refresh the displayed values after a new run.
+"""
+
+class Performance:
+    def __init__(self, root, font_settings):
+        self.root = root
+        self.font_settings = font_settings
+        self.main_color = '#6f12c0'
+        self.create_performance_window()
+
+    # Create the performance window with a frame for the report and a refresh button
+    def create_performance_window(self):
+        self.performance_window = tk.Toplevel(self.root)
+        self.performance_window.title("Performance")
+        self.performance_window.geometry("420x320")
+
+        self.report_frame = ttk.Frame(self.performance_window, padding = "3 3 12 12")
+        self.report_frame.pack(fill = "both", expand = True)
+
+        refresh_button = ttk.Button(self.performance_window, text = "Refresh", style = 'Custom.TButton', command = self.show_report)
+        refresh_button.pack(pady = 5)
+
+        self.show_report()
+
+    # Display the stage breakdown and counters of the last run
+    def show_report(self):
+        for widget in self.report_frame.winfo_children():
+            widget.destroy()
+
+        font_settings = (self.font_settings, 11)
+        report = profiler.get_report()
+        total_seconds = sum(span['seconds'] for span in report['spans'].values())
+
+        stages_label = ttk.Label(self.report_frame, text = "Stage Breakdown:", foreground = self.main_color, font = font_settings)
+        stages_label.grid(row = 0, column = 0, columnspan = 3, padx = 10, pady = 5, sticky = tk.W)
+
+        row = 1
+        for name, span in report['spans'].items():
+            share = span['seconds'] / total_seconds * 100 if total_seconds else 0
+
+            ttk.Label(self.report_frame, text = name, font = font_settings).grid(row = row, column = 0, padx = 20, sticky = tk.W)
+            ttk.Label(self.report_frame, text = f"{span['seconds'] * 1000:.1f} ms", font = font_settings).grid(row = row, column = 1, padx = 5, sticky = tk.E)
+            ttk.Label(self.report_frame, text = f"{share:.0f}% ({span['calls']}x)", font = font_settings).grid(row = row, column = 2, padx = 5, sticky = tk.E)
+            row += 1
+
+        if not report['spans']:
+            ttk.Label(self.report_frame, text = "No run recorded yet", font = font_settings).grid(row = row, column = 0, padx = 20, sticky = tk.W)
+            row += 1
+
+        counters_label = ttk.Label(self.report_frame, text = "Counters:", foreground = self.main_color, font = font_settings)
+        counters_label.grid(row = row, column = 0, columnspan = 3, padx = 10, pady = 5, sticky = tk.W)
+        row += 1
+
+        for name, value in report['counters'].items():
+            ttk.Label(self.report_frame, text = name, font = font_settings).grid(row = row, column = 0, padx = 20, sticky = tk.W)
+            ttk.Label(self.report_frame, text = str(value), font = font_settings).grid(row = row, column = 1, padx = 5, sticky = tk.E)
+            row += 1
@@ -0,0 +1,121 @@
+import cProfile
+import functools
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+"""
+    The Profiler class collects timing spans and counters for the stages of the Group Former application,
+    so it can be seen whether loading, processing, scoring or the team search is responsible for a slow run.
+
+    Key Responsibilities:
+    - Measure the duration and number of calls of named stages with a context manager or decorator.
+    - Count events such as scored candidates, cache hits and tried moves.
+    - Provide a report of the last run for the API, the command line and the Performance window of the GUI.
+    - Run a function under cProfile and tracemalloc for the --profile switch of the application.
+
+    A shared instance is available as `profiler`. The DataProcessor resets it when a survey is loaded and the
+    TeamForming resets its own stages when teams are generated, so the report always shows the last run.
+"""
+
+class Profiler:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.spans = {} # Stage name to [total seconds, calls]
+        self.counters = {}
+
+    # Measure the duration of the enclosed block under the given stage name
+    @contextmanager
+    def span(self, name):
+        started = time.perf_counter()
+
+        try:
+            yield
+
+        finally:
+            elapsed = time.perf_counter() - started
+
+            with self.lock:
+                span = self.spans.setdefault(name, [0.0, 0])
+                span[0] += elapsed
+                span[1] += 1
+
+    # Decorator to measure every call of a function under the given stage name
+    def timed(self, name):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    # Add to a counter, hot loops should count locally and add the total once
+    def count(self, name, amount = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    # Reset the given stages and all counters, or everything when no stages are given
+    def reset(self, stages = None):
+        with self.lock:
+            if stages is None:
+                self.spans.clear()
+            else:
+                for stage in stages:
+                    self.spans.pop(stage, None)
+
+            self.counters.clear()
+
+    def get_report(self):
+        # Return the stage breakdown and counters of the last run
+        with self.lock:
+            return {
+                'spans': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self.spans.items()},
+                'counters': dict(self.counters)
+            }
+
+    def format_report(self):
+        # Return the report as readable text
+        report = self.get_report()
+        lines = ["Stage breakdown:"]
+
+        for name, span in report['spans'].items():
+            lines.append(f"  {name:<28} {span['seconds'] * 1000:10.2f} ms  ({span['calls']} calls)")
+
+        lines.append("Counters:")
+
+        for name, value in report['counters'].items():
+            lines.append(f"  {name:<28} {value:>10}")
+
+        return '\n'.join(lines)
+
+# Shared profiler instance used by the DataProcessor, TeamForming and the GUI
+profiler = Profiler()
+
+# Run a function under cProfile and tracemalloc, dump the statistics to a file and print a summary
+def run_profiled(function, output_file = 'storage/profile.prof'):
+    tracemalloc.start()
+    cprofile = cProfile.Profile()
+    cprofile.enable()
+
+    try:
+        return function()
+
+    finally:
+        cprofile.disable()
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        cprofile.dump_stats(output_file)
+        pstats.Stats(cprofile).sort_stats('cumulative').print_stats(25)
+
+        print("Top memory allocations:")
+        for statistic in snapshot.statistics('lineno')[:10]:
+            print(f"  {statistic}")
+
+        print(profiler.format_report())
+        print(f"cProfile statistics written to {output_file}")
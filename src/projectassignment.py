@@ -0,0 +1,143 @@
+import argparse
+import math
+import numpy as np
+import pandas as pd
+from src.assignment import solve_capacitated_assignment
+from src.dataprocessor import DataProcessor
+from src.teamforming import TeamForming
+
+"""
+    The ProjectAssignment class assigns formed teams to the projects of the event, the games of the PreferredGames
+    questions, by the preferences of their members.
+
+    Key Responsibilities:
+    - Collect the projects from the games offered in the PreferredGamesEasy, PreferredGamesMedium and PreferredGamesHard answers.
+    - Aggregate the preferences of the members into a team x project matrix, a selected game counts more than a
+      matching PreferredChallenge.
+    - Assign every team to one project with the highest total preference while no project takes more teams than its
+      capacity, solved as an assignment problem with the Hungarian method in polynomial time.
+
+    The assignment is started with: python -m src.projectassignment survey.csv --sizes 4 3 5 --capacity 2
+"""
+
+class ProjectAssignment:
+    CHALLENGES = ('Easy', 'Medium', 'Hard')
+    GAME_PREFERENCE = 1.0 # A member selected the game of the project
+    CHALLENGE_PREFERENCE = 0.5 # The difficulty of the project is the preferred challenge of the member
+
+    def __init__(self, data_processor):
+        self.data_processor = data_processor
+        self.df = data_processor.get_data()
+        self.projects = self.collect_projects()
+        self.member_preferences = self.build_member_preferences()
+
+    # Projects as (challenge, game) pairs in the order the games appear in the answers
+    def collect_projects(self):
+        projects = {}
+
+        for challenge in self.CHALLENGES:
+            column = f'PreferredGames{challenge}'
+
+            if column not in self.df.columns:
+                continue
+
+            for entry in self.df[column]:
+                for game in self.selected_games(entry):
+                    projects[(challenge, game)] = None
+
+        return list(projects)
+
+    @staticmethod
+    def selected_games(entry):
+        return [game.strip() for game in str(entry).split(',') if game.strip() not in DataProcessor.NOT_SELECTED]
+
+    @staticmethod
+    def project_name(project):
+        challenge, game = project
+        return f"{game} ({challenge})"
+
+    # Preference of every member for every project: members x projects
+    def build_member_preferences(self):
+        preferences = np.zeros((len(self.df), len(self.projects)))
+        project_index = {project: index for index, project in enumerate(self.projects)}
+
+        if 'PreferredChallenge' in self.df.columns:
+            challenges = self.df['PreferredChallenge'].astype(str).str.strip().str.lower().to_numpy()
+            project_challenges = np.array([challenge.lower() for challenge, _ in self.projects])
+            preferences += self.CHALLENGE_PREFERENCE * (challenges[:, None] == project_challenges[None, :])
+
+        for challenge in self.CHALLENGES:
+            column = f'PreferredGames{challenge}'
+
+            if column not in self.df.columns:
+                continue
+
+            for member, entry in enumerate(self.df[column]):
+                for game in self.selected_games(entry):
+                    preferences[member, project_index[(challenge, game)]] += self.GAME_PREFERENCE
+
+        return preferences
+
+    # Summed preferences of the members of every team: teams x projects
+    def team_preferences(self, teams):
+        preferences = np.zeros((len(teams), len(self.projects)))
+
+        for index, team in enumerate(teams):
+            preferences[index] = self.member_preferences[list(team)].sum(axis = 0)
+
+        return preferences
+
+    # Capacities of all projects from a single number or a dict of project names, by default the teams are spread evenly
+    def project_capacities(self, total_teams, capacity = None):
+        if capacity is None:
+            capacity = math.ceil(total_teams / len(self.projects)) if self.projects else 0
+
+        if isinstance(capacity, dict):
+            return np.array([int(capacity.get(self.project_name(project), 0)) for project in self.projects], dtype = int)
+
+        return np.full(len(self.projects), int(capacity), dtype = int)
+
+    # Assign every team to a project, returns the project name of every team or None if no project had capacity left
+    def assign(self, teams, capacity = None):
+        if not self.projects:
+            print("Warning: The survey offers no projects to assign the teams to")
+            return [None] * len(teams)
+
+        gains = self.team_preferences(teams)
+        assignment = solve_capacitated_assignment(gains, self.project_capacities(len(teams), capacity))
+
+        return [self.project_name(self.projects[project]) if project >= 0 else None for project in assignment]
+
+    # Assign the teams and report the project, the preference and the number of members who selected the game of every team
+    def report(self, teams, capacity = None):
+        projects = self.assign(teams, capacity)
+        preferences = self.team_preferences(teams)
+        names = [self.project_name(project) for project in self.projects]
+        rows = []
+
+        for index, (team, project) in enumerate(zip(teams, projects)):
+            column = names.index(project) if project is not None else None
+
+            rows.append({
+                'team': index + 1,
+                'size': len(team),
+                'project': project,
+                'preference': round(float(preferences[index, column]), 2) if column is not None else 0.0,
+                'selected': int((self.member_preferences[list(team), column] >= self.GAME_PREFERENCE).sum()) if column is not None else 0
+            })
+
+        return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Form teams of a survey and assign them to the preferred games.")
+    parser.add_argument('survey', help = "Survey CSV file.")
+    parser.add_argument('--sizes', type = int, nargs = 3, default = (4, 3, 5), metavar = ('DESIRED', 'MIN', 'MAX'))
+    parser.add_argument('--capacity', type = int, default = None, help = "Maximum number of teams per project. Defaults to an even spread.")
+    args = parser.parse_args()
+
+    data_processor = DataProcessor(args.survey)
+    teamforming = TeamForming(data_processor)
+    desired_size, min_size, max_size = TeamForming.adjust_team_sizes(len(data_processor.get_data()), *args.sizes)
+    teams, _ = teamforming.generate_teams_greedy(desired_size, min_size, max_size, refine = True)
+
+    print(ProjectAssignment(data_processor).report(teams, args.capacity).to_string(index = False))
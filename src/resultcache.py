@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import time
+from src.profiler import profiler
+from src.snapshot import Snapshot
+
+"""
+    The ResultCache class keeps generated teams on disk, so a configuration that was already generated, for example
+    after flipping a toggle and flipping it back, returns its teams without running the search again.
+
+    Key Responsibilities:
+    - Build the cache key from the hash of the processed survey, the normalized weights, the homogenous, heterogenous
+      and emphasized attributes, the skill matching mode, the team sizes and the generation options.
+    - Store every result as a Snapshot file named after its key and restore it on a hit.
+    - Evict entries older than the maximum age and the least recently used entries above the maximum total size.
+
+    Files are written to a temporary name and renamed afterwards, so concurrent writers never leave partial entries.
+"""
+
+class ResultCache:
+    CACHE_DIRECTORY = 'storage/cache'
+
+    def __init__(self, directory = CACHE_DIRECTORY, max_bytes = 20 * 1024 * 1024, max_age = 30 * 24 * 3600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age # Seconds
+        os.makedirs(directory, exist_ok = True)
+
+    def key(self, data_processor, sizes, options = None):
+        # Weights are rounded so that the same settings always give the same key
+        weights = {attribute: round(float(weight), 9) for attribute, weight in data_processor.get_normalized_current_weights().items()}
+
+        content = json.dumps({
+            'survey': Snapshot.survey_hash(data_processor),
+            'interpreter': Snapshot.interpreter_hash(data_processor),
+            'weights': weights,
+            'homogenous': sorted(data_processor.get_homogenous_attributes()),
+            'heterogenous': sorted(data_processor.get_heterogenous_attributes()),
+            'emphasized': sorted(data_processor.get_emphasized_attributes()),
+            'ordinal': data_processor.get_scoring_config().ordinal,
+            'sizes': [int(size) for size in sizes],
+            'options': options or {}
+        }, sort_keys = True)
+
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    # Return the cached snapshot of the key or None, a hit refreshes the entry for the eviction
+    def get(self, key):
+        filepath = self.path(key)
+
+        try:
+            if time.time() - os.path.getmtime(filepath) > self.max_age:
+                os.remove(filepath)
+                return None
+
+            snapshot = Snapshot.load(filepath)
+            os.utime(filepath)
+
+        except (OSError, ValueError):
+            return None
+
+        profiler.count('result_cache_hits')
+        return snapshot
+
+    def put(self, key, snapshot):
+        filepath = self.path(key)
+        temporary_filepath = f"{filepath}.{os.getpid()}.tmp"
+
+        snapshot.save(temporary_filepath)
+        os.replace(temporary_filepath, filepath)
+
+        self.evict()
+
+    # Remove expired entries, then the least recently used entries until the cache fits into the maximum size
+    def evict(self):
+        now = time.time()
+        entries = []
+
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+
+            filepath = os.path.join(self.directory, name)
+
+            try:
+                status = os.stat(filepath)
+
+                if now - status.st_mtime > self.max_age:
+                    os.remove(filepath)
+                else:
+                    entries.append((status.st_mtime, status.st_size, filepath))
+
+            except OSError:
+                continue
+
+        total_bytes = sum(size for _, size, _ in entries)
+
+        for _, size, filepath in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+
+            try:
+                os.remove(filepath)
+                total_bytes -= size
+
+            except OSError:
+                continue
+
+    # Return the cached teams of the current configuration or generate and cache them
+    def generate_teams(self, teamforming, desired_size, min_size, max_size, **options):
+        data_processor = teamforming.data_processor
+        key = self.key(data_processor, (desired_size, min_size, max_size), options)
+        snapshot = self.get(key)
+
+        # The key holds the normalized weights, so the raw weights of the caller are kept instead of the cached ones
+        if snapshot is not None:
+            return snapshot.restore(data_processor, teamforming, restore_config = False)
+
+        teams, remaining_members = teamforming.generate_teams(desired_size, min_size, max_size, **options)
+        teamforming.set_teams(teams)
+        self.put(key, Snapshot.capture(data_processor, teamforming, remaining_members))
+
+        return teams, remaining_members
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,113 @@
+from types import MappingProxyType
+
+"""
+    The ScoringConfig class holds the settings that decide how members are scored: the weights, the homogenous,
+    heterogenous and emphasized attributes and whether skill levels are matched by their distance on the scale.
+
+    Key Responsibilities:
+    - Keep the settings immutable, every change returns a new ScoringConfig with the next version number.
+    - Answer membership and emphasis questions with sets instead of list scans.
+    - Compare and hash configurations by their contents, so equal settings give equal cache keys.
+    - List the parts that changed between two configurations, so scorers and caches only drop what depends on them.
+
+    A ScoringConfig pickles as a few tuples, so it is cheap to send to worker processes.
+"""
+
+class ScoringConfig:
+    __slots__ = ('weights', 'homogenous', 'heterogenous', 'emphasized', 'ordinal', 'emphasized_types', 'version', 'key')
+
+    def __init__(self, weights = None, homogenous = (), heterogenous = (), emphasized = (), ordinal = True, version = 0):
+        # Attributes are set through object.__setattr__ once, afterwards the instance is read-only
+        set_field = object.__setattr__
+        set_field(self, 'weights', MappingProxyType({attribute: float(weight) for attribute, weight in (weights or {}).items()}))
+        set_field(self, 'homogenous', frozenset(homogenous))
+        set_field(self, 'heterogenous', frozenset(heterogenous) - self.homogenous)
+        set_field(self, 'emphasized', tuple(dict.fromkeys(emphasized))) # Keeps the order in which attributes were emphasized
+        set_field(self, 'ordinal', bool(ordinal)) # Skill levels score by their distance instead of exact equality
+        set_field(self, 'version', version)
+
+        # The emphasis type is derived once instead of on every lookup
+        set_field(self, 'emphasized_types', MappingProxyType({
+            attribute: 'homogenous' if attribute in self.homogenous else 'heterogenous'
+            for attribute in self.emphasized if attribute in self.homogenous or attribute in self.heterogenous
+            }))
+
+        set_field(self, 'key', (
+            tuple(sorted(self.weights.items())),
+            tuple(sorted(self.homogenous)),
+            tuple(sorted(self.heterogenous)),
+            self.emphasized,
+            self.ordinal
+            ))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ScoringConfig is immutable, use replace to change it")
+
+    def __delattr__(self, name):
+        raise AttributeError("ScoringConfig is immutable, use replace to change it")
+
+    def __eq__(self, other):
+        return isinstance(other, ScoringConfig) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __reduce__(self):
+        return (ScoringConfig, (dict(self.weights), self.key[1], self.key[2], self.emphasized, self.ordinal, self.version))
+
+    def __repr__(self):
+        return (f"ScoringConfig(version={self.version}, homogenous={sorted(self.homogenous)}, "
+                f"heterogenous={sorted(self.heterogenous)}, emphasized={list(self.emphasized)}, ordinal={self.ordinal})")
+
+    # Return a configuration with the given settings replaced and the next version, or this one if nothing changed
+    def replace(self, **changes):
+        fields = {
+            'weights': self.weights,
+            'homogenous': self.homogenous,
+            'heterogenous': self.heterogenous,
+            'emphasized': self.emphasized,
+            'ordinal': self.ordinal
+            }
+        fields.update(changes)
+
+        config = ScoringConfig(version = self.version + 1, **fields)
+
+        return self if config == self else config
+
+    def with_weights(self, weights):
+        return self.replace(weights = weights)
+
+    def with_ordinal(self, ordinal):
+        return self.replace(ordinal = ordinal)
+
+    def with_homogenous(self, attribute):
+        return self.replace(homogenous = self.homogenous | {attribute}, heterogenous = self.heterogenous - {attribute})
+
+    def with_heterogenous(self, attribute):
+        return self.replace(homogenous = self.homogenous - {attribute}, heterogenous = self.heterogenous | {attribute})
+
+    def with_emphasized(self, attribute):
+        return self.replace(emphasized = self.emphasized + (attribute,))
+
+    def without_emphasized(self, attribute):
+        return self.replace(emphasized = tuple(emphasized for emphasized in self.emphasized if emphasized != attribute))
+
+    # Remove the attribute from the scoring completely
+    def without_attribute(self, attribute):
+        return self.replace(
+            homogenous = self.homogenous - {attribute},
+            heterogenous = self.heterogenous - {attribute},
+            emphasized = tuple(emphasized for emphasized in self.emphasized if emphasized != attribute)
+            )
+
+    def emphasis_type(self, attribute):
+        # Return 'homogenous', 'heterogenous' or None if the attribute is not emphasized
+        return self.emphasized_types.get(attribute)
+
+    def is_considered(self, attribute):
+        return attribute in self.homogenous or attribute in self.heterogenous
+
+    # Return the names of the parts that differ from the other configuration
+    def changes(self, other):
+        names = ('weights', 'homogenous', 'heterogenous', 'emphasized', 'ordinal')
+        return {name for name, own, others in zip(names, self.key, other.key) if own != others}
@@ -0,0 +1,384 @@
+import argparse
+import hashlib
+import json
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.dataprocessor import DataProcessor
+from src.teamforming import TeamForming
+from src.snapshot import Snapshot
+from src.resultcache import ResultCache
+from src.projectassignment import ProjectAssignment
+from src.profiler import profiler
+
+"""
+    The TeamService class exposes the team formation of the Group Former application as a small local HTTP/JSON service,
+    so other tools such as the registration site or chat bots can request teams programmatically.
+
+    Key Responsibilities:
+    - Accept survey uploads and keep the processed surveys warm in memory, keyed by the hash of the uploaded file.
+    - Accept team formation jobs for a cached or uploaded survey together with a scoring configuration.
+    - Queue the jobs in a bounded queue and run them on a bounded process pool.
+    - Return job IDs which can be polled for the status and the generated teams.
+
+    Endpoints:
+    - POST /surveys          Upload the raw survey CSV as request body. Returns the survey_id.
+    - GET  /surveys          List the cached survey IDs.
+    - POST /jobs             JSON body with 'survey_id' or 'survey' (CSV text) and an optional 'config'. Returns the job_id.
+    - GET  /jobs/<job_id>    Return the status of the job and the teams once it is done.
+
+    The config accepts 'weights', 'homogenous', 'heterogenous', 'emphasized', 'removed', 'ordinal' as in DataProcessor.apply_config
+    'desired_size', 'min_size' and 'max_size' for the team sizes, 'objective' ('sum' or 'balanced'), 'skill_tolerance' and 'hard_balance' for the skill balance band,
+    'diversity_weight' and 'diversity_measure' ('entropy' or 'coverage') for the team diversity, 'roles' for the roles every
+    team needs as in TeamForming.role_coverage, 'project_capacity' to assign the teams to the preferred games with at most
+    this many teams per game (true for an even spread) and 'seed'.
+    The service is started with: python -m src.service --port 8000
+"""
+
+OBJECTIVES = ('sum', 'balanced')
+DIVERSITY_MEASURES = ('entropy', 'coverage')
+
+# Check the fields of a job request before it is queued, raises ValueError with the message for the client
+def validate_job(payload):
+    if not isinstance(payload, dict):
+        raise ValueError("The request body must be a JSON object")
+
+    if 'survey' in payload and not isinstance(payload['survey'], str):
+        raise ValueError("'survey' must be the CSV text of the survey")
+
+    if payload.get('survey_id') is not None and not isinstance(payload['survey_id'], str):
+        raise ValueError("'survey_id' must be a string")
+
+    config = payload.get('config', {})
+
+    if not isinstance(config, dict):
+        raise ValueError("'config' must be a JSON object")
+
+    for key in ('desired_size', 'min_size', 'max_size'):
+        if key in config and (isinstance(config[key], bool) or not isinstance(config[key], int) or config[key] < 1):
+            raise ValueError(f"'{key}' must be a positive integer")
+
+    for key in ('skill_tolerance', 'diversity_weight'):
+        if config.get(key) is not None and (isinstance(config[key], bool) or not isinstance(config[key], (int, float))):
+            raise ValueError(f"'{key}' must be a number")
+
+    for key, expected, name in (('weights', dict, 'a JSON object'), ('homogenous', list, 'a list'), ('heterogenous', list, 'a list'),
+                                ('emphasized', list, 'a list'), ('removed', list, 'a list'), ('roles', list, 'a list')):
+        if config.get(key) is not None and not isinstance(config[key], expected):
+            raise ValueError(f"'{key}' must be {name}")
+
+    if config.get('seed') is not None and (isinstance(config['seed'], bool) or not isinstance(config['seed'], int)):
+        raise ValueError("'seed' must be an integer")
+
+    for key in ('ordinal', 'hard_balance'):
+        if config.get(key) is not None and not isinstance(config[key], bool):
+            raise ValueError(f"'{key}' must be true or false")
+
+    project_capacity = config.get('project_capacity')
+
+    if project_capacity is not None and not isinstance(project_capacity, bool) and (not isinstance(project_capacity, int) or project_capacity < 1):
+        raise ValueError("'project_capacity' must be true, false or a positive integer")
+
+    for role in config.get('roles') or []:
+        if not isinstance(role, dict) or not isinstance(role.get('attribute'), str) or not isinstance(role.get('values'), list):
+            raise ValueError("Every role must be a JSON object with an 'attribute' and a list of 'values'")
+
+        if 'min' in role and (isinstance(role['min'], bool) or not isinstance(role['min'], int) or role['min'] < 0):
+            raise ValueError("The 'min' of a role must be a non-negative integer")
+
+    if config.get('objective', 'sum') not in OBJECTIVES:
+        raise ValueError(f"Unknown objective: {config['objective']}, expected one of {', '.join(OBJECTIVES)}")
+
+    if config.get('diversity_measure', 'entropy') not in DIVERSITY_MEASURES:
+        raise ValueError(f"Unknown diversity measure: {config['diversity_measure']}, expected one of {', '.join(DIVERSITY_MEASURES)}")
+
+# Run a single team formation job, executed inside a worker process
+def run_job(data_processor, config):
+    started = time.perf_counter()
+
+    # Spans of an earlier job of this worker must not show up in the profile, for example on a cache hit
+    profiler.reset()
+    data_processor.apply_config(config)
+    teamforming = TeamForming(data_processor)
+
+    total_members = len(data_processor.get_data())
+    desired_size, min_size, max_size = TeamForming.adjust_team_sizes(
+        total_members,
+        int(config.get('desired_size', 4)),
+        int(config.get('min_size', 3)),
+        int(config.get('max_size', 5))
+        )
+
+    # Repeated configurations are answered from the on-disk result cache
+    teams, remaining_members = ResultCache().generate_teams(
+        teamforming, desired_size, min_size, max_size,
+        objective = config.get('objective', 'sum'),
+        skill_tolerance = config.get('skill_tolerance'),
+        hard_balance = bool(config.get('hard_balance', False)),
+        diversity_weight = config.get('diversity_weight'),
+        diversity_measure = config.get('diversity_measure', 'entropy'),
+        roles = config.get('roles'),
+        seed = config.get('seed')
+        )
+    names = data_processor.get_data()['Name'] if 'Name' in data_processor.get_data().columns else None
+
+    # Teams are only assigned to projects on request, the capacity true spreads them evenly over the games
+    project_capacity = config.get('project_capacity')
+    projects = [None] * len(teams)
+
+    if project_capacity is not None and project_capacity is not False:
+        projects = ProjectAssignment(data_processor).assign(teams, None if project_capacity is True else project_capacity)
+
+    return {
+        'teams': [
+            {
+                'members': [int(member) for member in team],
+                'names': [str(names[member]) for member in team] if names is not None else [],
+                'project': project
+            }
+            for team, project in zip(teams, projects)
+        ],
+        'remaining': [int(member) for member in remaining_members],
+        'sizes': {'desired_size': desired_size, 'min_size': min_size, 'max_size': max_size},
+        'config': data_processor.get_config(),
+        'snapshot': Snapshot.capture(data_processor, teamforming, remaining_members).data,
+        'profile': profiler.get_report(),
+        'duration': time.perf_counter() - started
+    }
+
+class TeamService:
+    def __init__(self, max_workers = 2, max_queue = 32, max_surveys = 16, max_jobs = 1000):
+        self.max_queue = max_queue
+        self.max_surveys = max_surveys
+        self.max_jobs = max_jobs
+
+        self.surveys = OrderedDict() # Warm processed surveys, keyed by survey_id
+        self.jobs = OrderedDict() # Job states, keyed by job_id
+
+        self.lock = threading.Lock()
+
+        self.executor = ProcessPoolExecutor(max_workers = max_workers)
+        self.slots = threading.BoundedSemaphore(max_workers)
+        self.queue = queue.Queue(maxsize = max_queue)
+
+        self.dispatcher = threading.Thread(target = self.dispatch, daemon = True)
+        self.dispatcher.start()
+
+    # Process an uploaded survey once and keep it in memory, repeated uploads of the same file skip the ingestion
+    def add_survey(self, content):
+        survey_id = hashlib.sha256(content).hexdigest()[:16]
+
+        with self.lock:
+            if survey_id in self.surveys:
+                self.surveys.move_to_end(survey_id)
+                profiler.count('survey_cache_hits')
+                return survey_id
+
+        # Each upload is processed in its own temporary directory, so concurrent uploads do not share files
+        with tempfile.TemporaryDirectory() as directory:
+            filepath = os.path.join(directory, 'survey.csv')
+
+            with open(filepath, 'wb') as file:
+                file.write(content)
+
+            try:
+                data_processor = DataProcessor(filepath, os.path.join(directory, 'transformed_results_survey.csv'))
+
+            except SystemExit:
+                # DataProcessor exits when the survey cannot be loaded
+                raise ValueError("The survey could not be loaded")
+
+        with self.lock:
+            self.surveys[survey_id] = data_processor
+
+            while len(self.surveys) > self.max_surveys:
+                self.surveys.popitem(last = False)
+
+        return survey_id
+
+    def get_survey_ids(self):
+        with self.lock:
+            return list(self.surveys.keys())
+
+    # Queue a job for a cached survey, raises queue.Full when the queue is at capacity
+    def submit(self, survey_id, config):
+        with self.lock:
+            if survey_id not in self.surveys:
+                raise KeyError(survey_id)
+
+            data_processor = self.surveys[survey_id]
+
+        job_id = uuid.uuid4().hex
+        job = {
+            'job_id': job_id,
+            'survey_id': survey_id,
+            'status': 'queued',
+            'submitted': time.time(),
+            'result': None,
+            'error': None
+        }
+
+        with self.lock:
+            self.jobs[job_id] = job
+            self.prune_jobs()
+
+        try:
+            self.queue.put_nowait((job_id, data_processor, config))
+
+        except queue.Full:
+            with self.lock:
+                del self.jobs[job_id]
+            raise
+
+        return job_id
+
+    def get_job(self, job_id):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            return dict(job) if job else None
+
+    # Forget the oldest finished jobs when more than max_jobs are stored
+    def prune_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in ('done', 'failed')]
+
+        for job_id in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job_id]
+
+    # Move queued jobs to the process pool whenever a worker slot is free
+    def dispatch(self):
+        while True:
+            job_id, data_processor, config = self.queue.get()
+            self.slots.acquire()
+
+            with self.lock:
+                self.jobs[job_id]['status'] = 'running'
+
+            # A broken or shut down pool rejects the job, it is marked as failed instead of stopping the dispatcher
+            try:
+                future = self.executor.submit(run_job, data_processor, config)
+
+            except (BrokenProcessPool, RuntimeError) as e:
+                self.slots.release()
+
+                with self.lock:
+                    if job_id in self.jobs:
+                        self.jobs[job_id]['error'] = f"The worker pool is not available: {e}"
+                        self.jobs[job_id]['status'] = 'failed'
+                        self.jobs[job_id]['finished'] = time.time()
+                continue
+
+            future.add_done_callback(lambda future, job_id = job_id: self.finish(job_id, future))
+
+    def finish(self, job_id, future):
+        self.slots.release()
+
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return
+
+            try:
+                job['result'] = future.result()
+                job['status'] = 'done'
+
+            except Exception as e:
+                job['error'] = str(e)
+                job['status'] = 'failed'
+
+            job['finished'] = time.time()
+
+    def shutdown(self):
+        self.executor.shutdown(wait = False, cancel_futures = True)
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    service = None
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length)
+
+    def do_GET(self):
+        if self.path == '/surveys':
+            self.send_json(200, {'surveys': self.service.get_survey_ids()})
+
+        elif self.path.startswith('/jobs/'):
+            job = self.service.get_job(self.path[len('/jobs/'):])
+
+            if job is None:
+                self.send_json(404, {'error': 'Unknown job'})
+            else:
+                self.send_json(200, job)
+
+        else:
+            self.send_json(404, {'error': 'Not found'})
+
+    def do_POST(self):
+        try:
+            if self.path == '/surveys':
+                survey_id = self.service.add_survey(self.read_body())
+                self.send_json(201, {'survey_id': survey_id})
+
+            elif self.path == '/jobs':
+                payload = json.loads(self.read_body() or b'{}')
+                validate_job(payload)
+                survey_id = payload.get('survey_id')
+
+                if 'survey' in payload:
+                    survey_id = self.service.add_survey(payload['survey'].encode('utf-8'))
+
+                job_id = self.service.submit(survey_id, payload.get('config', {}))
+                self.send_json(202, {'job_id': job_id, 'survey_id': survey_id})
+
+            else:
+                self.send_json(404, {'error': 'Not found'})
+
+        except KeyError:
+            self.send_json(404, {'error': 'Unknown survey, upload it first'})
+
+        except queue.Full:
+            self.send_json(503, {'error': 'Job queue is full, try again later'})
+
+        except (ValueError, json.JSONDecodeError) as e:
+            self.send_json(400, {'error': str(e)})
+
+def serve(host = '127.0.0.1', port = 8000, max_workers = 2, max_queue = 32):
+    service = TeamService(max_workers = max_workers, max_queue = max_queue)
+    handler = type('Handler', (ServiceRequestHandler,), {'service': service})
+    server = ThreadingHTTPServer((host, port), handler)
+
+    print(f"Group Former service listening on http://{host}:{port}")
+
+    try:
+        server.serve_forever()
+
+    except KeyboardInterrupt:
+        pass
+
+    finally:
+        server.server_close()
+        service.shutdown()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Run the Group Former team formation service.")
+    parser.add_argument('--host', default = '127.0.0.1')
+    parser.add_argument('--port', type = int, default = 8000)
+    parser.add_argument('--workers', type = int, default = 2, help = "Number of worker processes.")
+    parser.add_argument('--queue', type = int, default = 32, help = "Maximum number of queued jobs.")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.workers, args.queue)
@@ -0,0 +1,85 @@
+import argparse
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.dataprocessor import DataProcessor
+from src.teamforming import TeamForming, solve_greedy
+from src.localsearch import TeamState, LocalSearch
+
+"""
+    The SizeComparison class solves several team size configurations of the same survey at once, so organizers can
+    compare teams of for example 4, 5 or 6 members in one run.
+
+    Key Responsibilities:
+    - Compute the individual scores and the compatibility matrix once and share them with all worker processes.
+    - Solve every (desired, min, max) configuration concurrently with the greedy solver and the local search.
+    - Report the planned sizes, the objective, the worst team score and the number of remaining members side by side.
+
+    The comparison is started with: python -m src.sizecomparison survey.csv --sizes 4 3 5 --sizes 5 4 6
+"""
+
+# Individual scores and compatibility matrix shared by all solves of a worker process
+worker_state = {}
+
+def init_worker(individual_scores, compatibility_matrix):
+    worker_state['individual_scores'] = individual_scores
+    worker_state['compatibility_matrix'] = compatibility_matrix
+
+# Solve the teams for one size configuration, executed inside a worker process
+def solve_configuration(sizes):
+    started = time.perf_counter()
+    individual_scores = worker_state['individual_scores']
+    compatibility_matrix = worker_state['compatibility_matrix']
+
+    desired_size, min_size, max_size = TeamForming.adjust_team_sizes(len(individual_scores), *sizes)
+    teams = solve_greedy(individual_scores, compatibility_matrix, desired_size, min_size, max_size)
+
+    state = TeamState(teams, individual_scores, compatibility_matrix)
+    LocalSearch(state, min_size, max_size).run()
+    team_scores = [float(total) for total in state.totals]
+
+    return {
+        'desired_size': desired_size,
+        'min_size': min_size,
+        'max_size': max_size,
+        'plan': TeamForming.format_team_plan(TeamForming.plan_team_sizes(len(individual_scores), desired_size, min_size, max_size)),
+        'teams': len(state.teams),
+        'objective': round(sum(team_scores), 4),
+        'worst_team': round(min(team_scores), 4) if team_scores else 0,
+        'remaining': int((state.labels < 0).sum()),
+        'seconds': round(time.perf_counter() - started, 4)
+    }
+
+class SizeComparison:
+    def __init__(self, data_processor):
+        self.data_processor = data_processor
+        self.teamforming = TeamForming(data_processor)
+
+        # Score the members once, the scores are shared by all configurations
+        self.individual_scores = np.array(list(self.teamforming.calculate_individual_scores().values()))
+        self.compatibility_matrix = self.teamforming.build_compatibility_matrix()
+
+    # Configurations around the desired size, each with one member less and more as minimum and maximum
+    @staticmethod
+    def around(desired_size, steps = (-1, 0, 1)):
+        return [(desired_size + step, max(1, desired_size + step - 1), desired_size + step + 1) for step in steps if desired_size + step > 1]
+
+    def run(self, configurations, max_workers = None):
+        with ProcessPoolExecutor(max_workers = max_workers, initializer = init_worker, initargs = (self.individual_scores, self.compatibility_matrix)) as executor:
+            results = list(executor.map(solve_configuration, configurations))
+
+        return pd.DataFrame(results)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Compare several team size configurations of a survey.")
+    parser.add_argument('survey', help = "Survey CSV file.")
+    parser.add_argument('--sizes', type = int, nargs = 3, action = 'append', metavar = ('DESIRED', 'MIN', 'MAX'),
+                        help = "Configuration to compare, can be given several times. Defaults to the sizes around 4.")
+    parser.add_argument('--workers', type = int, default = None)
+    args = parser.parse_args()
+
+    size_comparison = SizeComparison(DataProcessor(args.survey))
+    configurations = [tuple(sizes) for sizes in args.sizes] if args.sizes else SizeComparison.around(4)
+
+    print(size_comparison.run(configurations, args.workers).to_string(index = False))
@@ -0,0 +1,110 @@
+import argparse
+import hashlib
+import json
+import time
+from src.dataprocessor import DataProcessor
+from src.teamforming import TeamForming
+
+"""
+    The Snapshot class stores the result of a team generation together with everything it depends on, so the same teams
+    can be restored later without running the search again.
+
+    Key Responsibilities:
+    - Hash the processed survey and the questionnaire interpreter.
+    - Capture the weights, the homogenous, heterogenous and emphasized attributes, the team sizes, the generation
+      options, the seed and the team assignment of the last run of a TeamForming.
+    - Save and load the snapshot as a compact JSON file.
+    - Restore the configuration and the teams after checking that the survey and the interpreter did not change.
+
+    The team search is deterministic for the same snapshot contents. Runs with a seed refine with a pass budget instead
+    of the time budget, so generating again with their stored configuration gives the same teams on every machine.
+
+    The teams of a snapshot are printed with: python -m src.snapshot survey.csv --snapshot storage/snapshot.json
+"""
+
+class Snapshot:
+    VERSION = 1
+    SNAPSHOT_FILE = 'storage/snapshot.json' # Snapshot of the last teams generated in the GUI
+
+    def __init__(self, data):
+        self.data = data
+
+    @staticmethod
+    def survey_hash(data_processor):
+        # Hash of the processed survey, independent of the file it was loaded from
+        content = data_processor.get_data().to_csv(index = False).encode('utf-8')
+        return hashlib.sha256(content).hexdigest()[:16]
+
+    @staticmethod
+    def interpreter_hash(data_processor):
+        content = json.dumps(data_processor.get_questionnaire_interpreter(), sort_keys = True).encode('utf-8')
+        return hashlib.sha256(content).hexdigest()[:16]
+
+    # Capture the last team generation of the TeamForming
+    @classmethod
+    def capture(cls, data_processor, teamforming, remaining_members = ()):
+        last_run = getattr(teamforming, 'last_run', {})
+
+        return cls({
+            'version': cls.VERSION,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'survey_hash': cls.survey_hash(data_processor),
+            'interpreter_hash': cls.interpreter_hash(data_processor),
+            'config': data_processor.get_config(),
+            'engine': last_run.get('engine', 'default'),
+            'sizes': last_run.get('sizes', []),
+            'seed': last_run.get('seed'),
+            'options': last_run.get('options', {}),
+            'teams': [[int(member) for member in team] for team in teamforming.teams],
+            'remaining': [int(member) for member in remaining_members]
+        })
+
+    def save(self, filepath):
+        with open(filepath, 'w') as file:
+            json.dump(self.data, file, separators = (',', ':'))
+
+    @classmethod
+    def load(cls, filepath):
+        with open(filepath, 'r') as file:
+            data = json.load(file)
+
+        if data.get('version') != cls.VERSION:
+            raise ValueError(f"Unsupported snapshot version: {data.get('version')}")
+
+        return cls(data)
+
+    # Check that the snapshot was taken from the same processed survey and interpreter
+    def matches(self, data_processor):
+        return (self.data['survey_hash'] == self.survey_hash(data_processor)
+                and self.data['interpreter_hash'] == self.interpreter_hash(data_processor))
+
+    # Restore the configuration and the teams without running the search, returns the teams and remaining members.
+    # Without restore_config only the teams are restored and the current configuration is kept
+    def restore(self, data_processor, teamforming, restore_config = True):
+        if not self.matches(data_processor):
+            raise ValueError("The snapshot was taken from a different survey or questionnaire interpreter.")
+
+        if restore_config:
+            data_processor.apply_config(self.data['config'], replace = True)
+
+        teams = [list(team) for team in self.data['teams']]
+        teamforming.set_teams(teams)
+        teamforming.last_run = {key: self.data[key] for key in ('engine', 'sizes', 'seed', 'options')}
+
+        return teams, list(self.data['remaining'])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Restore the teams of a snapshot without searching again.")
+    parser.add_argument('survey', help = "Survey CSV file the snapshot was taken from.")
+    parser.add_argument('--snapshot', default = Snapshot.SNAPSHOT_FILE, help = "Snapshot JSON file.")
+    args = parser.parse_args()
+
+    data_processor = DataProcessor(args.survey)
+    teams, remaining_members = Snapshot.load(args.snapshot).restore(data_processor, TeamForming(data_processor))
+    names = data_processor.get_data()['Name']
+
+    for index, team in enumerate(teams):
+        print(f"Team {index + 1}: {', '.join(str(names[member]) for member in team)}")
+
+    if remaining_members:
+        print(f"Remaining: {', '.join(str(names[member]) for member in remaining_members)}")
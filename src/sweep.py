@@ -0,0 +1,129 @@
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from src.dataprocessor import DataProcessor
+from src.teamforming import TeamForming, solve_greedy
+
+"""
+    The WeightSweep class evaluates many weight vectors for the skill attributes in one batch, so weights can be tuned
+    on past events without editing and regenerating by hand.
+
+    Key Responsibilities:
+    - Encode the members once as a members x attributes skill matrix and compute the compatibility matrix once.
+    - Score all weight vectors in one vectorized pass by multiplying the skill matrix with the weights x attributes matrix.
+    - Run the fast greedy solver for every weight vector in parallel worker processes.
+    - Report the objective, the worst team and how far the team assignment shifts compared to the baseline weights.
+
+    Weight vectors are read from a CSV file with one column per skill attribute and one row per vector, or generated
+    by changing one attribute at a time around the current weights.
+    The sweep is started with: python -m src.sweep survey.csv --steps -2 2 --output sweep.csv
+"""
+
+# Compatibility matrix and team sizes shared by all solves of a worker process
+worker_state = {}
+
+def init_worker(compatibility_matrix, sizes):
+    worker_state['compatibility_matrix'] = compatibility_matrix
+    worker_state['sizes'] = sizes
+
+# Solve the teams for one column of individual scores, executed inside a worker process
+def solve_vector(individual_scores):
+    compatibility_matrix = worker_state['compatibility_matrix']
+    teams = solve_greedy(individual_scores, compatibility_matrix, *worker_state['sizes'])
+
+    labels = np.full(len(individual_scores), -1)
+    team_scores = []
+
+    for index, team in enumerate(teams):
+        labels[team] = index
+        team_scores.append(individual_scores[team].sum() + compatibility_matrix[np.ix_(team, team)].sum() / 2)
+
+    return labels, team_scores
+
+class WeightSweep:
+    def __init__(self, data_processor, desired_size = 4, min_size = 3, max_size = 5):
+        self.data_processor = data_processor
+        self.teamforming = TeamForming(data_processor)
+        self.attributes = list(self.teamforming.skill_attributes)
+
+        # Encode the members and their compatibility once, both are shared by all weight vectors
+        self.skill_matrix = self.teamforming.encode_skill_matrix()
+        self.compatibility_matrix = self.teamforming.build_compatibility_matrix()
+
+        self.sizes = TeamForming.adjust_team_sizes(len(data_processor.get_data()), desired_size, min_size, max_size)
+
+    # Generate weight vectors that change one attribute at a time by the given steps around the base weights
+    def one_at_a_time(self, base_weights = None, steps = (-2, 2)):
+        base_weights = dict(base_weights or self.data_processor.current_weights)
+        weight_vectors = [base_weights]
+
+        for attribute in self.attributes:
+            for step in steps:
+                weights = dict(base_weights)
+                weights[attribute] = max(0, weights.get(attribute, 0) + step)
+                weight_vectors.append(weights)
+
+        return weight_vectors
+
+    def load_weight_vectors(self, filepath):
+        # Load weight vectors from a CSV file with one column per attribute
+        return pd.read_csv(filepath).to_dict('records')
+
+    # Build the normalized weights x attributes matrix
+    def weight_matrix(self, weight_vectors):
+        rows = []
+
+        for weights in weight_vectors:
+            normalized_weights = self.data_processor.normalize_weights({attribute: float(weight) for attribute, weight in weights.items()})
+            rows.append([normalized_weights.get(attribute, 1) for attribute in self.attributes])
+
+        return np.array(rows, dtype = float).reshape(len(weight_vectors), len(self.attributes))
+
+    # Evaluate all weight vectors, the first vector is the baseline the shifts are compared against
+    def run(self, weight_vectors, max_workers = None):
+        # Individual scores of all members for all weight vectors in one pass: members x vectors
+        individual_scores = self.skill_matrix @ self.weight_matrix(weight_vectors).T
+
+        with ProcessPoolExecutor(max_workers = max_workers, initializer = init_worker, initargs = (self.compatibility_matrix, self.sizes)) as executor:
+            results = list(executor.map(solve_vector, individual_scores.T))
+
+        baseline_labels = results[0][0]
+        baseline_together = baseline_labels[:, None] == baseline_labels[None, :]
+        upper = np.triu_indices(len(baseline_labels), k = 1)
+        rows = []
+
+        for index, (weights, (labels, team_scores)) in enumerate(zip(weight_vectors, results)):
+            together = labels[:, None] == labels[None, :]
+            changed = together != baseline_together
+
+            row = {'vector': index}
+            row.update({attribute: weights.get(attribute, 0) for attribute in self.attributes})
+            row.update({
+                'objective': round(float(sum(team_scores)), 4),
+                'worst_team': round(float(min(team_scores)), 4) if team_scores else 0,
+                'teams': len(team_scores),
+                'pairs_changed': round(float(changed[upper].mean()), 4) if len(upper[0]) else 0,
+                'members_moved': int(changed.any(axis = 1).sum()),
+                'assignment': ' '.join(str(label) for label in labels)
+                })
+            rows.append(row)
+
+        return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Evaluate many weight vectors for a survey in one batch.")
+    parser.add_argument('survey', help = "Survey CSV file.")
+    parser.add_argument('--vectors', help = "CSV file with one weight vector per row, the first row is the baseline.")
+    parser.add_argument('--steps', type = float, nargs = '+', default = [-2, 2], help = "Steps for the one at a time sweep around the current weights.")
+    parser.add_argument('--sizes', type = int, nargs = 3, default = [4, 3, 5], metavar = ('DESIRED', 'MIN', 'MAX'))
+    parser.add_argument('--workers', type = int, default = None)
+    parser.add_argument('--output', default = 'storage/weight_sweep.csv')
+    args = parser.parse_args()
+
+    weight_sweep = WeightSweep(DataProcessor(args.survey), *args.sizes)
+    weight_vectors = weight_sweep.load_weight_vectors(args.vectors) if args.vectors else weight_sweep.one_at_a_time(steps = args.steps)
+
+    report = weight_sweep.run(weight_vectors, args.workers)
+    report.to_csv(args.output, index = False)
+    print(report.drop(columns = 'assignment').to_string(index = False))
@@ -1,4 +1,13 @@
 import itertools
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from src.profiler import profiler
+from src.localsearch import TeamState, LocalSearch, SkillBalance, TeamDiversity, RoleCoverage
+from src.annealing import SimulatedAnnealing
+from src.balanced import BalancedSearch
+from src.assignment import solve_capacitated_assignment
 
 """
     The TeamForming class is responsible for forming teams based on the data provided by the DataProcessor.
@@ -18,90 +27,287 @@ import itertools
 """
 
 class TeamForming:
+    # Profiled stages of a team generation run
+    STAGES = ('calculate_individual_scores', 'compatibility_matrix', 'combination_search', 'leftover_assignment', 'refinement', 'balancing', 'annealing', 'check_for_names')
+
+    SEEDED_PASSES = 50 # Pass budget of the refinement in seeded runs, most searches converge in far fewer passes
+    ANNEALING_TEMPERATURE_SCALE = 0.08 # Cooler start of the annealing from refined teams, hotter starts dissolve the local optimum
+
     def __init__(self, data_processor):
         # Initialize the TeamForming class with data from the data_processor
         self.data_processor = data_processor
-        self.df = data_processor.get_data()  # DataFrame containing member data
         self.skill_attributes = data_processor.get_skill_attributes()  # List of skill attributes
         self.questionnaire_interpreter = data_processor.get_questionnaire_interpreter()  # Interpreter for questionnaire data
         self.teams = []  # List to store generated teams
+        self.pinned = {}  # Members pinned to a team index by the organizers
+        self.forbidden = set()  # Pairs of members that must not share a team
+        self.encoded_attributes = None  # Number of members and encoded attributes of the last compatibility encoding
+
+        # Only attribute changes make the encoding stale, weight changes do not
+        data_processor.add_config_listener(self.on_config_change)
+
+    # DataFrame containing member data, read from the DataProcessor so appended members are included
+    @property
+    def df(self):
+        return self.data_processor.get_data()
 
+    def on_config_change(self, old_config, new_config):
+        if old_config.changes(new_config) - {'weights'}:
+            self.encoded_attributes = None
+
+    @profiler.timed('calculate_individual_scores')
     def calculate_individual_scores(self):
         # Get normalized weights for current skills
         self.normalized_current_weights = self.data_processor.get_normalized_current_weights()
 
-        # Calculate individual scores for each member based on their skill attributes and weights
-        scores = {}
+        # Calculate individual scores for each member as the product of the encoded skill matrix and the weights
+        weights = np.array([self.normalized_current_weights.get(attribute, 1) for attribute in self.skill_attributes], dtype = float)
+        scores = self.encode_skill_matrix() @ weights
 
-        for member in self.df.index:
-            score = 0
-            for attribute in self.skill_attributes:
-                try:
-                    # Split attribute values if they are comma-separated
-                    values = self.df.loc[member, attribute].split(', ')
-
-                    for value in values:
-                        # Get scale information for the attribute from the questionnaire interpreter under 'SkillLevelAssessment'
-                        scale_info = self.questionnaire_interpreter['SkillLevelAssessment'].get(attribute, {})
-                        scale = scale_info.get('scale', {}) if isinstance(scale_info, dict) else {}
-
-                        if isinstance(scale, dict):
-                            # Check if the value is in the scale dictionary
-                            for key, val in scale.items():
-                                if isinstance(val, list) and value in val:
-                                    # Add score based on the scale and weight
-                                    score += int(key) * self.normalized_current_weights.get(attribute, 1)
-                                    break
-                                if val == value:
-                                    # Add score based on the scale and weight
-                                    score += int(key) * self.normalized_current_weights.get(attribute, 1)
-                                    break
+        return dict(zip(self.df.index, scores.tolist()))
 
-                        elif isinstance(scale, list) and value in scale:
-                            # Add score based on the index in the scale list and weight
-                            score += (scale.index(value) + 1) * self.normalized_current_weights.get(attribute, 1)
+    # Encode the skill attributes of all members as a members x attributes matrix of their summed scale ranks
+    def encode_skill_matrix(self):
+        skill_level_assessment = self.questionnaire_interpreter.get('SkillLevelAssessment', {})
+        matrix = np.zeros((len(self.df.index), len(self.skill_attributes)))
 
-                except KeyError as e:
-                    # Handle missing attributes
-                    print(f"Error processing attribute {attribute} for member {member}: {e}")
+        for column, attribute in enumerate(self.skill_attributes):
+            # Get scale information for the attribute from the questionnaire interpreter under 'SkillLevelAssessment'
+            scale_info = skill_level_assessment.get(attribute, {})
+            scale = scale_info.get('scale', {}) if isinstance(scale_info, dict) else {}
 
-            # Store the calculated score for the member
-            scores[member] = score
+            try:
+                # Every distinct answer is ranked once and shared by all members with the same answer
+                ranks = {}
 
-        return scores
+                for row, entry in enumerate(self.df[attribute]):
+                    if entry not in ranks:
+                        ranks[entry] = self.calculate_scale_rank(str(entry), scale)
+                    matrix[row, column] = ranks[entry]
 
-    def calculate_compatibility_scores(self, member1, member2):
-        # Get homogenous and heterogenous attributes
-        self.homogenous_attributes = self.data_processor.get_homogenous_attributes()
-        self.heterogenous_attributes = self.data_processor.get_heterogenous_attributes()
+            except KeyError as e:
+                # Handle missing attributes
+                print(f"Error processing attribute {attribute}: {e}")
+
+        return matrix
+
+    def calculate_scale_rank(self, entry, scale):
+        # Sum the ranks of the comma-separated values of an answer on the given scale
+        rank = 0
 
-        # Get emphasized attributes and their types
-        emphasized_attributes = self.data_processor.get_emphasized_attributes()
-        emphasized_attributes_type = self.data_processor.get_emphasized_attributes_type()
+        for value in entry.split(', '):
+            if isinstance(scale, dict):
+                # Check if the value is in the scale dictionary
+                for key, val in scale.items():
+                    if isinstance(val, list) and value in val:
+                        rank += int(key)
+                        break
+                    if val == value:
+                        rank += int(key)
+                        break
+
+            elif isinstance(scale, list) and value in scale:
+                # Use the index in the scale list as rank
+                rank += scale.index(value) + 1
+
+        return rank
+
+    def calculate_compatibility_scores(self, member1, member2):
+        # The scoring configuration answers the attribute and emphasis lookups from sets, without rebuilding anything per pair
+        scoring_config = self.data_processor.get_scoring_config()
+        multi_select_attributes = self.data_processor.get_multi_select_attributes()
 
         compatibility_score = 0
 
         # Calculate compatibility score based on homogenous and heterogenous attributes
-        for attribute in self.homogenous_attributes:
-            if self.df.loc[member1, attribute] == self.df.loc[member2, attribute]:
+        for attribute in scoring_config.homogenous:
+            if self.is_ordinal(attribute):
+                # Skill levels score by how close they are on the scale
+                closeness = self.level_closeness(attribute, self.df.loc[member1, attribute], self.df.loc[member2, attribute])
+                compatibility_score += (5 if scoring_config.emphasis_type(attribute) == 'homogenous' else 1) * closeness
+
+            elif attribute in multi_select_attributes:
+                # Multi-select answers score by the share of options both members selected
+                selections = self.data_processor.get_selections(attribute)
+                similarity = self.selection_similarity(selections[member1], selections[member2])
+                compatibility_score += (5 if scoring_config.emphasis_type(attribute) == 'homogenous' else 1) * similarity
+
+            elif self.df.loc[member1, attribute] == self.df.loc[member2, attribute]:
                 compatibility_score += 1
 
                 # Check if the attribute is emphasized and homogenous to give additional score
-                if attribute in emphasized_attributes and emphasized_attributes_type.get(attribute) == 'homogenous':
-                    if self.df.loc[member1, attribute] == self.df.loc[member2, attribute]:
-                        compatibility_score += 4
+                if scoring_config.emphasis_type(attribute) == 'homogenous':
+                    compatibility_score += 4
+
+        for attribute in scoring_config.heterogenous:
+            if self.is_ordinal(attribute):
+                closeness = self.level_closeness(attribute, self.df.loc[member1, attribute], self.df.loc[member2, attribute])
+                compatibility_score += (8 if scoring_config.emphasis_type(attribute) == 'heterogenous' else 2) * (1 - closeness)
+
+            elif attribute in multi_select_attributes:
+                selections = self.data_processor.get_selections(attribute)
+                similarity = self.selection_similarity(selections[member1], selections[member2])
+                compatibility_score += (8 if scoring_config.emphasis_type(attribute) == 'heterogenous' else 2) * (1 - similarity)
 
-        for attribute in self.heterogenous_attributes:
-            if self.df.loc[member1, attribute] != self.df.loc[member2, attribute]:
+            elif self.df.loc[member1, attribute] != self.df.loc[member2, attribute]:
                 compatibility_score += 2
 
-                if attribute in emphasized_attributes and emphasized_attributes_type.get(attribute) == 'heterogenous':
-                    if self.df.loc[member1, attribute] != self.df.loc[member2, attribute]:
-                        compatibility_score += 6
+                if scoring_config.emphasis_type(attribute) == 'heterogenous':
+                    compatibility_score += 6
 
         return compatibility_score
 
-    def all_combinations(self, members, min_size, max_size):
+    # Single-select skill attributes are matched by their distance on the scale when the ordinal mode is on
+    def is_ordinal(self, attribute):
+        return (self.data_processor.get_scoring_config().ordinal and attribute in self.skill_attributes
+                and attribute not in self.data_processor.get_multi_select_attributes())
+
+    # Return the scale of the skill attribute and the distance between its lowest and highest rank
+    def skill_scale(self, attribute):
+        scale_info = self.questionnaire_interpreter.get('SkillLevelAssessment', {}).get(attribute, {})
+        scale = scale_info.get('scale', {}) if isinstance(scale_info, dict) else {}
+
+        if isinstance(scale, dict) and scale:
+            ranks = [int(rank) for rank in scale]
+            return scale, max(ranks) - min(ranks)
+
+        return scale, max(len(scale) - 1, 0) if isinstance(scale, list) else 0
+
+    # Closeness of two skill levels between 1 for the same level and 0 for the two ends of the scale
+    def level_closeness(self, attribute, entry1, entry2):
+        scale, span = self.skill_scale(attribute)
+        distance = abs(self.calculate_scale_rank(str(entry1), scale) - self.calculate_scale_rank(str(entry2), scale))
+
+        return 1 - min(distance / span, 1) if span else float(entry1 == entry2)
+
+    # Encode a skill attribute as the ranks of its levels divided by the span of the scale
+    def encode_levels(self, attribute):
+        scale, span = self.skill_scale(attribute)
+        codes, uniques = pd.factorize(self.df[attribute])
+
+        # Every distinct level is ranked once, missing answers (code -1) get the rank of unknown levels
+        ranks = np.array([self.calculate_scale_rank(str(entry), scale) for entry in uniques] + [0], dtype = float)
+
+        return ranks[codes] / span if span else codes
+
+    # Jaccard similarity of the selected options of two multi-select answers, two answers without any selected option are equal
+    @staticmethod
+    def selection_similarity(options1, options2):
+        union = options1 | options2
+
+        return len(options1 & options2) / len(union) if union else 1.0
+
+    # Encode a multi-select attribute as answer codes and the bitmasks of the selected options of every distinct answer.
+    # The options come from the checkbox columns of the survey, not from the merged answer text
+    def encode_selections(self, attribute):
+        codes, selections = pd.factorize(self.data_processor.get_selections(attribute))
+        bits = {option: bit for bit, option in enumerate(sorted(set().union(*selections)))}
+
+        # 64 options per word, the extra last row is the empty mask of missing answers (code -1)
+        masks = np.zeros((len(selections) + 1, max(1, -(-len(bits) // 64))), dtype = np.uint64)
+
+        for row, selected in enumerate(selections):
+            for option in selected:
+                masks[row, bits[option] // 64] |= np.uint64(1) << np.uint64(bits[option] % 64)
+
+        return codes, masks
+
+    # Calculate the compatibility scores between all members at once as a members x members matrix
+    def build_compatibility_matrix(self):
+        matrix = self.compatibility_block(self.encode_compatibility_attributes(), np.arange(len(self.df.index)))
+
+        # A member is never paired with themselves
+        np.fill_diagonal(matrix, 0)
+
+        return matrix
+
+    # Encode every considered attribute as integer answer codes with the score for equal and for different answers
+    def encode_compatibility_attributes(self):
+        # The encoding is kept until the attributes change or members are appended
+        total_members = len(self.df.index)
+
+        if self.encoded_attributes is not None and self.encoded_attributes[0] == total_members:
+            return self.encoded_attributes[1]
+
+        scoring_config = self.data_processor.get_scoring_config()
+        encoded_attributes = []
+
+        # Same scoring as calculate_compatibility_scores, missing answers are encoded as -1 and never equal, like NaN == NaN
+        # Multi-select attributes are encoded as a pair of answer codes and bitmasks of the distinct answers, skill levels
+        # in the ordinal mode as float ranks
+        for attribute in sorted(scoring_config.homogenous):
+            emphasized = scoring_config.emphasis_type(attribute) == 'homogenous'
+            encoded_attributes.append((self.encode_attribute(attribute), 5 if emphasized else 1, 0))
+
+        for attribute in sorted(scoring_config.heterogenous):
+            emphasized = scoring_config.emphasis_type(attribute) == 'heterogenous'
+            encoded_attributes.append((self.encode_attribute(attribute), 0, 8 if emphasized else 2))
+
+        self.encoded_attributes = (total_members, encoded_attributes)
+
+        return encoded_attributes
+
+    def encode_attribute(self, attribute):
+        if self.is_ordinal(attribute):
+            return self.encode_levels(attribute)
+
+        if attribute in self.data_processor.get_multi_select_attributes():
+            return self.encode_selections(attribute)
+
+        codes, _ = pd.factorize(self.df[attribute])
+        return codes
+
+    def compatibility_block(self, encoded_attributes, rows):
+        # Calculate the compatibility scores of the given rows with all members as a rows x members matrix
+        block = np.zeros((len(rows), len(self.df.index)))
+
+        for codes, equal_score, different_score in encoded_attributes:
+            if isinstance(codes, tuple):
+                # Partial overlaps of multi-select answers score in between equal and different answers, the
+                # similarity is calculated between the distinct answers and then looked up for every member
+                codes, masks = codes
+                equal = jaccard_similarity(masks[codes[rows]], masks)[:, codes]
+            elif codes.dtype.kind == 'f':
+                # Skill levels score by their closeness, the distance of the normalized ranks, calculated between the
+                # few distinct levels of the scale and then looked up for every member
+                levels, level_codes = np.unique(codes, return_inverse = True)
+                closeness = 1 - np.minimum(np.abs(levels[:, None] - levels[None, :]), 1)
+                equal = closeness[level_codes[rows]][:, level_codes]
+            else:
+                row_codes = codes[rows][:, None]
+                equal = (row_codes == codes[None, :]) & (row_codes >= 0)
+
+            block += different_score + (equal_score - different_score) * equal
+
+        return block
+
+    # Keep only the top k most compatible partners of every member, computed in blocks of rows so memory stays at n · k
+    def build_neighbor_graph(self, k = 20, block_size = 512):
+        encoded_attributes = self.encode_compatibility_attributes()
+        total_members = len(self.df.index)
+        k = max(0, min(k, total_members - 1))
+
+        neighbors = np.zeros((total_members, k), dtype = np.int64)
+        neighbor_scores = np.zeros((total_members, k))
+
+        for start in range(0, total_members, block_size):
+            rows = np.arange(start, min(start + block_size, total_members))
+            block = self.compatibility_block(encoded_attributes, rows)
+
+            # Exclude the member themselves before selecting the partners
+            block[np.arange(len(rows)), rows] = -1
+
+            if k:
+                top = np.argpartition(-block, k - 1, axis = 1)[:, :k]
+                neighbors[rows] = top
+                neighbor_scores[rows] = np.take_along_axis(block, top, axis = 1)
+
+        profiler.count('compatibility_pairs', total_members * k)
+
+        return neighbors, neighbor_scores
+
+    @staticmethod
+    def all_combinations(members, min_size, max_size):
         # Generate all possible combinations of members with sizes ranging from min_size to max_size
         combinations = []
 
@@ -110,7 +316,8 @@ class TeamForming:
 
         return combinations
 
-    def calculate_total_scores(self, combination, individual_scores, compatibility_scores):
+    @staticmethod
+    def calculate_total_scores(combination, individual_scores, compatibility_scores):
         # Calculate the total score for a given combination of members
         total_score = 0
 
@@ -126,12 +333,15 @@ class TeamForming:
         return total_score
 
     # Check for names with high GroupImportance values and KnownParticipants and place them in teams accordingly
+    @profiler.timed('check_for_names')
     def check_for_names(self, teams, max_size, min_size, individual_scores, compatibility_scores):
 
         # Convert the teams to lists for easier manipulation
         for i, team in enumerate(teams):
             teams[i] = list(team)
 
+        moves_tried = 0
+
         # Check if the members have high GroupImportance values and check for KnownParticipants
         for team in teams:
             for member in team[:]:
@@ -153,7 +363,8 @@ class TeamForming:
                         for participant in known_participants:
                             for other_team in teams:
                                 if participant in [self.df.loc[member, 'Name'] for member in other_team]:
-                                    if member not in other_team and len(other_team) < max_size:
+                                    # Like in the LocalSearch the two teams only exchange their sizes, so the planned sizes are kept
+                                    if member not in other_team and len(other_team) < max_size and len(other_team) == len(team) - 1:
                                         if len(team) > min_size:
                                             team.remove(member)
                                             other_team.append(member)
@@ -169,9 +380,10 @@ class TeamForming:
 
                         # Check if the known participants are in the same team and split them
                         for other_team in teams:
-                            if other_team != current_team and len(other_team) < max_size:
+                            if other_team != current_team and len(other_team) < max_size and len(other_team) == len(current_team) - 1:
                                 if not any(participant in [self.df.loc[member, 'Name'] for member in other_team] for participant in known_participants):
                                         if member not in other_team:
+                                            moves_tried += 1
                                             combination = other_team + [member]
                                             total_score = self.calculate_total_scores(combination, individual_scores, compatibility_scores)
 
@@ -186,47 +398,97 @@ class TeamForming:
 
                 except KeyError as e:
                     print(f"Error seperating member {member}: {e}")
-            
+
+        profiler.count('moves_tried', moves_tried)
+
         return teams
 
 
-    def generate_teams(self, desired_size, min_size, max_size):
+    # The objective is 'sum' for the highest total of all team scores or 'balanced' to raise the worst team afterwards.
+    # With a skill tolerance the summed individual scores of every team are kept within that fraction of the cohort mean
+    # The default search is deterministic, but a wall clock time budget stops the refinement at different points on
+    # different machines. A run with a seed is reproducible: the time budget is replaced by a budget of passes and steps
+    def generate_teams(self, desired_size, min_size, max_size, refine = True, time_budget = 2.0, objective = 'sum',
+                       skill_tolerance = None, hard_balance = False, seed = None, diversity_weight = None, diversity_measure = 'entropy',
+                       roles = None):
+        # Start a new profiling run for the team generation stages
+        profiler.reset(self.STAGES)
+
+        max_passes = None
+
+        if seed is not None:
+            time_budget, max_passes = None, self.SEEDED_PASSES
+
+        self.last_run = {
+            'engine': 'default',
+            'sizes': [desired_size, min_size, max_size],
+            'seed': seed,
+            'options': {'refine': refine, 'time_budget': time_budget, 'max_passes': max_passes, 'objective': objective, 'skill_tolerance': skill_tolerance,
+                        'hard_balance': hard_balance, 'diversity_weight': diversity_weight, 'diversity_measure': diversity_measure, 'roles': roles}
+        }
+
         # Calculate individual scores for all members
         individual_scores = self.calculate_individual_scores()
 
         # Get a list of all members
         members = list(self.df.index)
 
-        # Calculate compatibility scores between all pairs of members
-        compatibility_scores = {
-            member1: {
-                member2: self.calculate_compatibility_scores(member1, member2)
-                for member2 in members
-            }
-            for member1 in members
-        }
+        # Calculate compatibility scores between all pairs of members, rows and columns follow the member positions
+        with profiler.span('compatibility_matrix'):
+            compatibility_matrix = self.build_compatibility_matrix()
+            compatibility_scores = compatibility_matrix.tolist()
+        profiler.count('compatibility_pairs', len(members) ** 2)
+
+        teams, members = self.search_teams(members, individual_scores, compatibility_scores, desired_size, min_size, max_size)
+
+        # Improve the teams of the greedy rounds with moves and swaps between the teams
+        if refine or skill_tolerance is not None or diversity_weight is not None or roles:
+            skill_balance = SkillBalance(list(individual_scores.values()), skill_tolerance, hard_balance) if skill_tolerance is not None else None
+            diversity = self.team_diversity(diversity_weight, diversity_measure)
+            teams = self.refine_teams(teams, list(individual_scores.values()), compatibility_matrix, min_size, max_size, time_budget, skill_balance, diversity,
+                                      self.role_coverage(roles), max_passes)
+
+        if objective == 'balanced':
+            max_steps = max_passes * len(teams) if max_passes is not None else None
+            teams = self.balance_teams(teams, list(individual_scores.values()), compatibility_matrix, min_size, max_size, time_budget, max_steps)
+
+        # Check for names with high GroupImportance values and KnownParticipants
+        self.check_for_names(teams, max_size, min_size, individual_scores, compatibility_scores)
+
+        return teams, members
+
+    # Search the best teams round by round over all combinations and place the remaining members afterwards.
+    # Every round fills the next size of the planned team sizes, so members are only left over if no valid plan exists
+    @staticmethod
+    def search_teams(members, individual_scores, compatibility_scores, desired_size, min_size, max_size):
+        members = list(members)
         teams = []
         unassigned_members = members.copy()
+        candidates_scored = 0
+        # Smaller teams first, the combinations of the larger teams are cheaper once fewer members are left
+        planned_sizes = sorted(TeamForming.plan_team_sizes(len(members), desired_size, min_size, max_size))
 
         while members:
             best_score = None
             best_team = None
 
-            # Iterate over team sizes
-            for size in [desired_size, min_size]:
-                # Iterate over all possible team combinations for team sizes
-                for combination in self.all_combinations(members, size, size):
-                    # Calculate total score for the combination
-                    total_score = self.calculate_total_scores(combination, individual_scores, compatibility_scores)
+            with profiler.span('combination_search'):
+                # Iterate over the planned size of this round
+                for size in planned_sizes[len(teams):len(teams) + 1]:
+                    # Iterate over all possible team combinations for team sizes
+                    for combination in TeamForming.all_combinations(members, size, size):
+                        # Calculate total score for the combination
+                        total_score = TeamForming.calculate_total_scores(combination, individual_scores, compatibility_scores)
+                        candidates_scored += 1
 
-                    # If the score is better than the best score so far, update the best score and team
-                    if best_score is None or total_score > best_score:
-                        best_score = total_score
-                        best_team = combination
+                        # If the score is better than the best score so far, update the best score and team
+                        if best_score is None or total_score > best_score:
+                            best_score = total_score
+                            best_team = combination
 
-                # If a best team is found for the current team size, break out of the loop
-                if best_team:
-                    break
+                    # If a best team is found for the current team size, break out of the loop
+                    if best_team:
+                        break
 
             # After evaluating all team sizes, add the best team to the list of teams and remove the members from the pool
             if best_team:
@@ -235,41 +497,646 @@ class TeamForming:
                 unassigned_members = [member for member in unassigned_members if member not in best_team]
             else:
 
-                # Handle any remaining members that were not assigned to a team
-                while unassigned_members:
-                    # Get the first remaining member and find the best team to add them to
-                    remaining_member = unassigned_members.pop(0)
-                    best_score = None
-                    best_team = None
+                with profiler.span('leftover_assignment'):
+                    # Place the remaining members by their marginal gain for every team below max_size, solved as one
+                    # assignment problem instead of one member after the other
+                    gains = np.array([
+                        [individual_scores[member] + sum(compatibility_scores[member][other] for other in team) for team in teams]
+                        for member in unassigned_members
+                        ]).reshape(len(unassigned_members), len(teams))
+                    candidates_scored += gains.size
 
-                    # Iterate over the teams to find the best team to add the remaining member to similar to the previous loop
-                    for team in teams:
-                        if len(team) < max_size:
-                            combination = list(team) + [remaining_member]
-                            team_score = self.calculate_total_scores(combination, individual_scores, compatibility_scores)
+                    teams = [list(team) for team in teams]
+                    unplaced_members = place_leftovers(teams, unassigned_members, gains, max_size)
+                    teams = [tuple(team) for team in teams]
 
-                            if best_score is None or team_score > best_score:
-                                best_score = team_score
-                                best_team = team
+                    members = [member for member in members if member not in unassigned_members or member in unplaced_members]
+                    unassigned_members = []
 
-                    # Add the remaining member to the best team
-                    if best_team:
+                break
 
-                        best_team_index = teams.index(best_team)
-                        best_team = list(best_team)
-                        best_team.append(remaining_member)
-                        # Update the teams list and replace with the new team
-                        teams[best_team_index] = tuple(best_team)
+        profiler.count('candidates_scored', candidates_scored)
 
-                        members.remove(remaining_member)
+        return teams, members
 
-                break
+    # Improve teams by moving and swapping members between them until no improving move is left or the time budget is used
+    @profiler.timed('refinement')
+    def refine_teams(self, teams, individual_scores, compatibility_matrix, min_size, max_size, time_budget = None, skill_balance = None,
+                     diversity = None, role_coverage = None, max_passes = None):
+        state = TeamState(teams, individual_scores, compatibility_matrix)
+        self.refinement_report = LocalSearch(state, min_size, max_size, time_budget, skill_balance, diversity = diversity,
+                                             role_coverage = role_coverage, max_passes = max_passes).run()
 
-        # Check for names with high GroupImportance values and KnownParticipants
-        self.check_for_names(teams, max_size, min_size, individual_scores, compatibility_scores)
+        # Teams that still miss a role could not be filled, usually because too few members have the role
+        if role_coverage is not None and self.refinement_report['missing_roles']:
+            print(f"Warning: {self.refinement_report['missing_roles']} required role members are missing in the teams")
 
-        return teams, members
+        return state.teams
+
+    # Required roles of every team, None if no roles are given. Every role is a dict with the 'attribute', the 'values' that
+    # count for the role and the 'min' number of members, for example {'attribute': 'GitFamiliarity', 'values':
+    # ['to a large extent', 'completely'], 'min': 1}. Members of multi-select attributes count if they selected any value
+    def role_coverage(self, roles):
+        if not roles:
+            return None
+
+        multi_select_attributes = self.data_processor.get_multi_select_attributes()
+        masks = []
+
+        for role in roles:
+            attribute = role['attribute']
+
+            if attribute not in self.df.columns:
+                raise ValueError(f"Unknown attribute of the role: {attribute}")
+
+            values = {str(value) for value in role['values']}
+
+            if attribute in multi_select_attributes:
+                masks.append([bool(options & values) for options in self.data_processor.get_selections(attribute)])
+            else:
+                masks.append(self.df[attribute].astype(str).isin(values).to_numpy())
+
+        return RoleCoverage(np.array(masks, dtype = bool), [int(role.get('min', 1)) for role in roles])
+
+    # Reward for teams covering many answers of the heterogenous attributes, None if no weight is given.
+    # Multi-select attributes are left out, their answers are combinations rather than values to cover
+    def team_diversity(self, weight, measure = 'entropy'):
+        if weight is None:
+            return None
+
+        scoring_config = self.data_processor.get_scoring_config()
+        multi_select_attributes = self.data_processor.get_multi_select_attributes()
+        codes = [pd.factorize(self.df[attribute])[0] for attribute in sorted(scoring_config.heterogenous) if attribute not in multi_select_attributes]
+
+        return TeamDiversity(codes, weight, measure)
+
+    def pin_member(self, member, team_index):
+        # Pin a member to a team of the current teams, the member is placed there and never moved by a re-solve
+        self.pinned[member] = team_index
+
+    def unpin_member(self, member):
+        self.pinned.pop(member, None)
+
+    def forbid_pair(self, member, other_member):
+        # Keep two members apart in every re-solve
+        if member != other_member:
+            self.forbidden.add(frozenset((member, other_member)))
+
+    def allow_pair(self, member, other_member):
+        self.forbidden.discard(frozenset((member, other_member)))
+
+    # Warm start after a small change of the settings: the current teams from set_teams are rescored with the new settings
+    # and only improved by moves and swaps, the stability penalty is subtracted for every member leaving its team.
+    # Pinned members are placed into their teams first and stay fixed, forbidden pairs are split before the search.
+    # The objective, the diversity options and the seed are the same as for generate_teams
+    def regenerate_teams(self, min_size, max_size, stability_penalty = 0.0, time_budget = 2.0, objective = 'sum',
+                         diversity_weight = None, diversity_measure = 'entropy', seed = None):
+        profiler.reset(self.STAGES)
+
+        max_passes = None
+
+        if seed is not None:
+            time_budget, max_passes = None, self.SEEDED_PASSES
+
+        individual_scores = np.array(list(self.calculate_individual_scores().values()))
+
+        with profiler.span('compatibility_matrix'):
+            compatibility_matrix = self.build_compatibility_matrix()
+
+        positions = {member: position for position, member in enumerate(self.df.index)}
+        teams = [[positions[member] for member in team] for team in self.teams]
+
+        # Place the pinned members into their teams
+        fixed = np.zeros(len(self.df), dtype = bool)
+
+        for member, team_index in self.pinned.items():
+            if member not in positions or not 0 <= team_index < len(teams):
+                print(f"Error pinning member {member}: unknown member or team {team_index + 1}")
+                continue
+
+            position = positions[member]
+            source = next((index for index, team in enumerate(teams) if position in team), None)
+            target = teams[team_index]
+
+            if source == team_index:
+                fixed[position] = True
+                continue
+
+            # Like the moves of the LocalSearch a pin only exchanges the sizes of the two teams, otherwise a free member
+            # of the target team is exchanged, so the planned team sizes are kept
+            if len(target) >= max_size or (source is not None and len(target) != len(teams[source]) - 1):
+                free_members = [other for other in target if not fixed[other]]
+
+                if source is None or not free_members:
+                    print(f"Error pinning member {member}: team {team_index + 1} is full or has no free member to exchange")
+                    continue
+
+                # The exchanged member goes to the source team, the free member fitting it best is chosen
+                staying = [other for other in teams[source] if other != position]
+                exchanged = max(free_members, key = lambda other: compatibility_matrix[other, staying].sum())
+                target.remove(exchanged)
+                teams[source].append(exchanged)
+
+            if source is not None:
+                teams[source].remove(position)
+
+            target.append(position)
+            fixed[position] = True
+
+        forbidden = {}
+
+        for pair in self.forbidden:
+            if not all(member in positions for member in pair):
+                continue
+
+            member, other_member = (positions[member] for member in pair)
+            forbidden.setdefault(member, []).append(other_member)
+            forbidden.setdefault(other_member, []).append(member)
+
+        assigned = {member for team in teams for member in team}
+
+        with profiler.span('refinement'):
+            state = TeamState(teams, individual_scores, compatibility_matrix)
+            local_search = LocalSearch(state, min_size, max_size, time_budget, stability_penalty = stability_penalty, fixed = fixed, forbidden = forbidden,
+                                       diversity = self.team_diversity(diversity_weight, diversity_measure), max_passes = max_passes)
+            local_search.separate()
+            self.refinement_report = local_search.run()
+
+        if objective == 'balanced':
+            with profiler.span('balancing'):
+                max_steps = max_passes * len(state.teams) if max_passes is not None else None
+                self.balancing_report = BalancedSearch(state, min_size, max_size, time_budget, max_steps, fixed = fixed, forbidden = forbidden).run()
+
+        # Swaps of the search can still split pairs the moves of separate could not
+        unresolved_pairs = local_search.unresolved_pairs()
+        self.refinement_report['unresolved_pairs'] = unresolved_pairs
+
+        if unresolved_pairs:
+            print(f"Error keeping members apart: {unresolved_pairs} forbidden pairs still share a team")
+
+        self.last_run = {
+            'engine': 'warm_start',
+            'sizes': [None, min_size, max_size],
+            'seed': seed,
+            'options': {
+                'stability_penalty': stability_penalty,
+                'time_budget': time_budget,
+                'max_passes': max_passes,
+                'objective': objective,
+                'diversity_weight': diversity_weight,
+                'diversity_measure': diversity_measure,
+                'pinned': {str(member): team_index for member, team_index in self.pinned.items()},
+                'forbidden': sorted(sorted(str(member) for member in pair) for pair in self.forbidden)
+            }
+        }
+
+        remaining_members = [self.df.index[position] for position in range(len(self.df)) if position not in assigned]
+
+        return [[self.df.index[member] for member in team] for team in state.teams], remaining_members
+
+    # Place late arrivals into the current teams with the highest gain and room below max_size, the other members stay
+    # in their teams. Only the compatibility rows of the new members are computed. Returns the teams and unplaced members
+    def insert_members(self, new_members, max_size):
+        positions = {member: position for position, member in enumerate(self.df.index)}
+        new_positions = np.array([positions[member] for member in new_members], dtype = int)
+        teams = [list(team) for team in self.teams]
+
+        individual_scores = np.array(list(self.calculate_individual_scores().values()))
+
+        with profiler.span('compatibility_matrix'):
+            block = self.compatibility_block(self.encode_compatibility_attributes(), new_positions).astype(float)
+
+        # Gain of every new member for every team: its individual score and its summed compatibility with the team
+        gains = np.zeros((len(new_members), len(teams)))
+
+        for index, team in enumerate(teams):
+            gains[:, index] = block[:, [positions[member] for member in team]].sum(axis = 1)
+
+        gains += individual_scores[new_positions][:, None]
+        sizes = np.array([len(team) for team in teams])
+        waiting = np.ones(len(new_members), dtype = bool)
+
+        with profiler.span('leftover_assignment'):
+            while waiting.any() and len(teams):
+                # Insert the new member with the highest gain into its best team with room left
+                candidates = np.where(waiting[:, None] & (sizes < max_size)[None, :], gains, -np.inf)
+                row, column = np.unravel_index(int(np.argmax(candidates)), candidates.shape)
+
+                if not np.isfinite(candidates[row, column]):
+                    break
+
+                teams[column].append(new_members[row])
+                sizes[column] += 1
+                waiting[row] = False
+
+                # New members joining the same team later also gain the compatibility with this member
+                gains[:, column] += block[:, new_positions[row]]
+
+        profiler.count('candidates_scored', len(new_members) * len(teams))
+
+        remaining_members = [member for member, is_waiting in zip(new_members, waiting) if is_waiting]
+
+        return teams, remaining_members
+
+    # Raise the score of the worst team with moves and swaps, the summed objective may drop for a fairer split
+    @profiler.timed('balancing')
+    def balance_teams(self, teams, individual_scores, compatibility_matrix, min_size, max_size, time_budget = None, max_steps = None):
+        state = TeamState(teams, individual_scores, compatibility_matrix)
+        self.balancing_report = BalancedSearch(state, min_size, max_size, time_budget, max_steps).run()
+
+        return state.teams
+
+    # Fast greedy variant of generate_teams, used where many solves are needed such as the weight sweep
+    def generate_teams_greedy(self, desired_size, min_size, max_size, individual_scores = None, compatibility_matrix = None, refine = False, time_budget = None,
+                              objective = 'sum', skill_tolerance = None, hard_balance = False, diversity_weight = None, diversity_measure = 'entropy',
+                              roles = None):
+        if individual_scores is None:
+            individual_scores = np.array(list(self.calculate_individual_scores().values()))
+        if compatibility_matrix is None:
+            compatibility_matrix = self.build_compatibility_matrix()
+
+        teams = solve_greedy(individual_scores, compatibility_matrix, desired_size, min_size, max_size)
+
+        if refine or skill_tolerance is not None or diversity_weight is not None or roles:
+            skill_balance = SkillBalance(individual_scores, skill_tolerance, hard_balance) if skill_tolerance is not None else None
+            diversity = self.team_diversity(diversity_weight, diversity_measure)
+            teams = self.refine_teams(teams, individual_scores, compatibility_matrix, min_size, max_size, time_budget, skill_balance, diversity,
+                                      self.role_coverage(roles))
+
+        if objective == 'balanced':
+            teams = self.balance_teams(teams, individual_scores, compatibility_matrix, min_size, max_size, time_budget)
+
+        return [[self.df.index[member] for member in team] for team in teams], self.unassigned_members(teams)
+
+    # Members without a planned team or a free slot below max_size, teams hold the positions of the members
+    def unassigned_members(self, teams):
+        assigned = {member for team in teams for member in team}
+        return [self.df.index[member] for member in range(len(self.df.index)) if member not in assigned]
+
+    # Simulated annealing variant of generate_teams, anneals the refined greedy teams and reports the improvement curve.
+    # Annealing from the raw greedy teams never catches up with the LocalSearch, so it starts from the local optimum with
+    # a cool start temperature and the final teams are polished by another LocalSearch. Without an iteration budget the
+    # iterations grow with members x teams, the number of different moves
+    def generate_teams_annealing(self, desired_size, min_size, max_size, iterations = None, seed = 0,
+                                 start_temperature = None, end_temperature = 0.01):
+        profiler.reset(self.STAGES)
+
+        individual_scores = np.array(list(self.calculate_individual_scores().values()))
+
+        with profiler.span('compatibility_matrix'):
+            compatibility_matrix = self.build_compatibility_matrix()
+
+        with profiler.span('combination_search'):
+            teams = solve_greedy(individual_scores, compatibility_matrix, desired_size, min_size, max_size)
+
+        with profiler.span('refinement'):
+            state = TeamState(teams, individual_scores, compatibility_matrix)
+            LocalSearch(state, min_size, max_size).run()
+
+        if iterations is None:
+            iterations = max(20000, len(individual_scores) * len(state.teams) // 2)
+
+        self.last_run = {
+            'engine': 'annealing',
+            'sizes': [desired_size, min_size, max_size],
+            'seed': seed,
+            'options': {'iterations': iterations, 'start_temperature': start_temperature, 'end_temperature': end_temperature}
+        }
+
+        with profiler.span('annealing'):
+            annealing = SimulatedAnnealing(state, min_size, max_size, iterations, start_temperature, end_temperature, seed = seed,
+                                           temperature_scale = self.ANNEALING_TEMPERATURE_SCALE)
+            self.annealing_report = annealing.run()
+
+        # Polish the final teams of the annealing, the best teams seen during the run are kept if they are still better
+        with profiler.span('refinement'):
+            state = TeamState(annealing.final_teams, individual_scores, compatibility_matrix)
+            LocalSearch(state, min_size, max_size).run()
+
+        teams = state.teams if state.objective() > self.annealing_report['best_objective'] else annealing.best_teams
+        self.annealing_report['final_objective'] = float(max(state.objective(), self.annealing_report['best_objective']))
+
+        return [[self.df.index[member] for member in team] for team in teams], self.unassigned_members(teams)
+
+    # Sparse variant of generate_teams for very large cohorts, only the top k partners of every member are scored
+    def generate_teams_sparse(self, desired_size, min_size, max_size, k = 20, block_size = 512):
+        individual_scores = np.array(list(self.calculate_individual_scores().values()))
+
+        with profiler.span('compatibility_matrix'):
+            neighbors, neighbor_scores = self.build_neighbor_graph(k, block_size)
+
+        teams = solve_sparse(individual_scores, neighbors, neighbor_scores, desired_size, min_size, max_size)
+
+        return [[self.df.index[member] for member in team] for team in teams], self.unassigned_members(teams)
+
+    # Hierarchical variant of generate_teams for thousands of participants: members are partitioned into balanced buckets
+    # of similar homogenous answers, every bucket is solved in parallel with the greedy search and the LocalSearch, a
+    # repair pass fixes the leftovers and team sizes and a final LocalSearch moves members across the buckets
+    def generate_teams_hierarchical(self, desired_size, min_size, max_size, bucket_size = 32, max_workers = None, refine = True, time_budget = None):
+        profiler.reset(self.STAGES)
+
+        individual_scores = np.array(list(self.calculate_individual_scores().values()))
+        encoded_attributes = self.encode_compatibility_attributes()
+
+        with profiler.span('partition_members'):
+            buckets = partition_members(self.encode_homogenous_features(), np.arange(len(self.df.index)), bucket_size, desired_size)
+
+        # Every bucket only needs its own block of the compatibility matrix
+        tasks = []
+        for bucket in buckets:
+            block = self.compatibility_block(encoded_attributes, bucket)[:, bucket]
+            np.fill_diagonal(block, 0)
+            tasks.append((individual_scores[bucket].tolist(), block, desired_size, min_size, max_size, refine))
+
+        with profiler.span('combination_search'):
+            with ProcessPoolExecutor(max_workers = max_workers) as executor:
+                results = list(executor.map(solve_bucket, tasks))
+
+        teams = []
+        remaining_members = []
+
+        for bucket, (bucket_teams, bucket_remaining) in zip(buckets, results):
+            teams.extend([[int(bucket[member]) for member in team] for team in bucket_teams])
+            remaining_members.extend(int(bucket[member]) for member in bucket_remaining)
+
+        with profiler.span('leftover_assignment'):
+            teams, remaining_members = self.repair_teams(teams, remaining_members, encoded_attributes, min_size, max_size)
+
+        # Members of similar answers share a bucket, a final search moves members between the teams of different buckets
+        if refine:
+            with profiler.span('refinement'):
+                state = TeamState(teams, individual_scores, self.build_compatibility_matrix())
+                self.refinement_report = LocalSearch(state, min_size, max_size, time_budget).run()
+                teams = state.teams
+
+        return [[self.df.index[member] for member in team] for team in teams], [self.df.index[member] for member in remaining_members]
+
+    def encode_homogenous_features(self):
+        # One-hot encode the answers of the homogenous attributes to cluster members with similar answers
+        features = []
+
+        for attribute in self.data_processor.get_homogenous_attributes():
+            codes, uniques = pd.factorize(self.df[attribute])
+            one_hot = np.zeros((len(codes), len(uniques) + 1))
+            one_hot[np.arange(len(codes)), codes] = 1 # Missing answers (-1) use the last column
+            features.append(one_hot)
+
+        return np.hstack(features) if features else np.zeros((len(self.df.index), 1))
+
+    # Dissolve teams below min_size where possible and place the leftovers into the team with the highest gain below max_size
+    def repair_teams(self, teams, remaining_members, encoded_attributes, min_size, max_size):
+        teams = [list(team) for team in teams]
+        remaining_members = list(remaining_members)
+
+        for team in sorted([team for team in teams if len(team) < min_size], key = len):
+            free_places = sum(max_size - len(other_team) for other_team in teams if other_team is not team and len(other_team) >= min_size)
+
+            if free_places >= len(team) + len(remaining_members):
+                remaining_members.extend(team)
+                teams.remove(team)
+
+        if not remaining_members:
+            return teams, []
+
+        labels = np.full(len(self.df.index), -1)
+        for index, team in enumerate(teams):
+            labels[team] = index
+
+        assigned = labels >= 0
+        block = self.compatibility_block(encoded_attributes, np.array(remaining_members))
+        still_remaining = []
+
+        for row, member in enumerate(remaining_members):
+            # Summed compatibility of the member with every team
+            gains = np.bincount(labels[assigned], weights = block[row, assigned], minlength = len(teams))
+            gains[[len(team) >= max_size for team in teams]] = -np.inf
+
+            if len(teams) and np.isfinite(gains.max()):
+                index = int(np.argmax(gains))
+                teams[index].append(member)
+                labels[member] = index
+                assigned[member] = True
+            else:
+                still_remaining.append(member)
+
+        return teams, still_remaining
+
+    # Plan the sizes of all teams up front: the number of teams closest to total / desired within the range allowed by
+    # min_size and max_size, with the members spread evenly. Returns the sizes, largest first, their sum is below the
+    # total only if no split within min_size and max_size exists
+    @staticmethod
+    def plan_team_sizes(total_members, desired_size, min_size, max_size):
+        if total_members <= 0:
+            return []
+
+        fewest_teams = -(-total_members // max_size)
+        most_teams = total_members // min_size
+
+        if fewest_teams > most_teams:
+            # No valid split, form as many teams of max_size as possible and leave the rest. Without enough members
+            # for a single team of min_size no team is planned and all members stay remaining
+            return [min(max_size, total_members)] * most_teams
+
+        best_sizes = None
+
+        for team_count in {total_members // desired_size, -(-total_members // desired_size)}:
+            team_count = min(max(team_count, fewest_teams), most_teams)
+            size, larger_teams = divmod(total_members, team_count)
+            sizes = [size + 1] * larger_teams + [size] * (team_count - larger_teams)
+            deviation = sum(abs(team_size - desired_size) for team_size in sizes)
+
+            # Prefer the plan closest to the desired size, then fewer teams
+            if best_sizes is None or (deviation, team_count) < best_sizes[0]:
+                best_sizes = ((deviation, team_count), sizes)
+
+        return best_sizes[1]
+
+    @staticmethod
+    def format_team_plan(sizes):
+        # Describe a plan as for example "5 teams of 4, 2 teams of 5"
+        if not sizes:
+            return "no teams"
+
+        counts = {size: sizes.count(size) for size in sorted(set(sizes))}
+        return ', '.join(f"{count} team{'s' if count > 1 else ''} of {size}" for size, count in counts.items())
+
+    @staticmethod
+    def adjust_team_sizes(total_members, desired_size, min_size, max_size):
+        # Adjust invalid team sizes with the same rules the GUI applies before generating
+        if desired_size > total_members:
+            desired_size = total_members
+
+        if max_size < desired_size:
+            max_size = desired_size + 1
+
+        if min_size > desired_size:
+            min_size = desired_size - 1
+            if min_size <= 1:
+                min_size = desired_size
+
+        return desired_size, min_size, max_size
 
     def set_teams(self, teams):
         # Set the teams attribute with the generated teams
-        self.teams = teams
\ No newline at end of file
+        self.teams = teams
+
+# Jaccard similarity of every row mask with every mask, the selected options are counted with a vectorized popcount
+def jaccard_similarity(row_masks, masks):
+    counts = np.bitwise_count(masks).sum(axis = 1, dtype = np.int32)
+    row_counts = np.bitwise_count(row_masks).sum(axis = 1, dtype = np.int32)
+    shared = np.zeros((len(row_masks), len(masks)), dtype = np.int32)
+
+    for word in range(masks.shape[1]):
+        shared += np.bitwise_count(row_masks[:, word][:, None] & masks[:, word][None, :])
+
+    union = row_counts[:, None] + counts[None, :] - shared
+
+    # Two answers without any selected option are equal, like their identical answer strings
+    return np.divide(shared, union, out = np.ones(union.shape), where = union > 0)
+
+# Form teams greedily from score arrays: every planned team starts with the strongest unassigned member and grows by the
+# member with the highest marginal gain, leftovers of an infeasible plan join the teams below max_size. Runs in O(n² · size).
+def solve_greedy(individual_scores, compatibility_matrix, desired_size, min_size, max_size):
+    individual_scores = np.asarray(individual_scores, dtype = float)
+    available = np.ones(len(individual_scores), dtype = bool)
+    teams = []
+
+    # Fill the planned team sizes one after the other
+    for size in TeamForming.plan_team_sizes(len(individual_scores), desired_size, min_size, max_size):
+        if available.sum() >= size:
+            gains = np.where(available, individual_scores, -np.inf)
+            team = [int(np.argmax(gains))]
+            available[team[0]] = False
+            team_sums = compatibility_matrix[team[0]].astype(float)
+
+            while len(team) < size:
+                gains = np.where(available, individual_scores + team_sums, -np.inf)
+                member = int(np.argmax(gains))
+                team.append(member)
+                available[member] = False
+                team_sums += compatibility_matrix[member]
+
+            teams.append(team)
+
+    # Place the remaining members into the teams below the maximum size by their marginal gains
+    leftovers = np.flatnonzero(available)
+    gains = np.zeros((len(leftovers), len(teams)))
+
+    for index, team in enumerate(teams):
+        gains[:, index] = compatibility_matrix[np.ix_(leftovers, team)].sum(axis = 1)
+
+    place_leftovers(teams, leftovers.tolist(), gains + individual_scores[leftovers][:, None], max_size)
+
+    return teams
+
+# Place leftover members into teams with free slots below max_size by solving the assignment problem over their
+# marginal gains, gains is leftovers x teams. The teams are extended in place, returns the members without a slot
+def place_leftovers(teams, leftovers, gains, max_size):
+    capacities = [max_size - len(team) for team in teams]
+    assignment = solve_capacitated_assignment(gains, capacities)
+    unplaced_members = []
+
+    for member, team_index in zip(leftovers, assignment):
+        if team_index >= 0:
+            teams[team_index].append(member)
+        else:
+            unplaced_members.append(member)
+
+    return unplaced_members
+
+# Form teams greedily from a top k neighbor graph: a team grows by the candidate with the highest gain among the
+# neighbors of its members, so only the known edges are scored and memory stays bounded by n · k
+def solve_sparse(individual_scores, neighbors, neighbor_scores, desired_size, min_size, max_size):
+    individual_scores = np.asarray(individual_scores, dtype = float)
+    available = np.ones(len(individual_scores), dtype = bool)
+    seeds = iter(np.argsort(-individual_scores, kind = 'stable'))
+    teams = []
+
+    # Fill the planned team sizes one after the other, like solve_greedy
+    for size in TeamForming.plan_team_sizes(len(individual_scores), desired_size, min_size, max_size):
+        if available.sum() < size:
+            break
+
+        seed = next(member for member in seeds if available[member])
+        team = [int(seed)]
+        available[seed] = False
+        candidates = {}
+
+        while len(team) < size:
+            # Add the known compatibility of the newest member to its available neighbors
+            for neighbor, score in zip(neighbors[team[-1]], neighbor_scores[team[-1]]):
+                if available[neighbor]:
+                    candidates[int(neighbor)] = candidates.get(int(neighbor), 0) + score
+
+            candidates = {member: score for member, score in candidates.items() if available[member]}
+
+            if candidates:
+                member = max(candidates, key = lambda candidate: individual_scores[candidate] + candidates[candidate])
+            else:
+                # No known partner is left, continue with the strongest available member
+                member = int(np.argmax(np.where(available, individual_scores, -np.inf)))
+
+            team.append(member)
+            available[member] = False
+
+        teams.append(team)
+
+    # Place the remaining members into the team of their most compatible known partner that is below the maximum size
+    team_of = {member: index for index, team in enumerate(teams) for member in team}
+
+    for member in np.flatnonzero(available):
+        gains = {}
+
+        for neighbor, score in zip(neighbors[member], neighbor_scores[member]):
+            index = team_of.get(int(neighbor))
+            if index is not None and len(teams[index]) < max_size:
+                gains[index] = gains.get(index, 0) + score
+
+        if gains:
+            index = max(gains, key = gains.get)
+        else:
+            open_teams = [index for index, team in enumerate(teams) if len(team) < max_size]
+            if not open_teams:
+                continue
+            index = min(open_teams, key = lambda index: len(teams[index]))
+
+        teams[index].append(int(member))
+        team_of[int(member)] = index
+
+    return teams
+
+# Solve a single bucket of the hierarchical mode with the regular search, executed inside a worker process
+def solve_bucket(task):
+    individual_scores, compatibility_matrix, desired_size, min_size, max_size, refine = task
+    individual_scores = np.asarray(individual_scores, dtype = float)
+    teams = solve_greedy(individual_scores, compatibility_matrix, desired_size, min_size, max_size)
+    assigned = {member for team in teams for member in team}
+    remaining_members = [member for member in range(len(individual_scores)) if member not in assigned]
+
+    # Refine the teams within the bucket, the buckets are small enough to run until no improving move is left
+    if refine:
+        state = TeamState(teams, individual_scores, compatibility_matrix)
+        LocalSearch(state, min_size, max_size).run()
+        teams = state.teams
+
+    return [list(team) for team in teams], remaining_members
+
+# Split the members recursively along the main direction of their features into balanced buckets of at most
+# bucket_size members, the split points are multiples of the desired team size so the buckets fill whole teams
+def partition_members(features, members, bucket_size, desired_size):
+    if len(members) <= bucket_size:
+        return [members]
+
+    centered = features[members] - features[members].mean(axis = 0)
+
+    if centered.any():
+        _, _, directions = np.linalg.svd(centered, full_matrices = False)
+        order = members[np.argsort(centered @ directions[0], kind = 'stable')]
+    else:
+        order = members
+
+    total_buckets = math.ceil(len(members) / bucket_size)
+    split = round(len(members) * (total_buckets // 2) / total_buckets / desired_size) * desired_size
+    split = min(max(split, desired_size), len(members) - 1)
+
+    return partition_members(features, order[:split], bucket_size, desired_size) + partition_members(features, order[split:], bucket_size, desired_size)
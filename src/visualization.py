@@ -20,11 +20,15 @@ import networkx as nx
 class Visualization:
     def __init__(self, data_processor):
         self.data_processor = data_processor
-        self.df = data_processor.get_data()
 
         self.main_color = '#6f12c0'
         self.secondary_color = '#d4c9ef'
 
+    # Member data of the DataProcessor, so appended members are included
+    @property
+    def df(self):
+        return self.data_processor.get_data()
+
     # Handle pronouns based on the given gender pro member
     def get_pronouns(self, gender, gender_other):
         gender = str(gender.lower())
@@ -0,0 +1,95 @@
+import csv
+import os
+import random
+import sys
+import pytest
+
+"""
+    Shared fixtures of the tests. The surveys are generated with the columns of the pre-event-survey export, so the
+    DataProcessor runs with the interpreter and the weights of the storage folder.
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ANSWERS = {
+    'CodingExperience': ['very inexperienced', 'inexperienced', 'comparable', 'experienced', 'very experienced'],
+    'PythonProficiency': ['beginner', 'intermediate', 'advanced', 'expert'],
+    'ExperienceYears': ['1 - 6 months', '6 - 12 months', '1 - 2 years', '2 - 3 years', '3 - 5 years', 'more than 5 years'],
+    'ProgrammingContext': ['Exploring/Beginners. Just exploring programming or experimenting.', 'Hobby/Personal Projects. For fun or personal interest.'],
+    'GitFamiliarity': ['not at all', 'to some extent', 'to a moderate extent', 'to a large extent', 'completely'],
+    'PrimaryLanguage': ['Python', 'Java', 'C++', 'Other'],
+    'PreferredChallenge': ['Easy', 'Medium', 'Hard'],
+    'GroupImportance': ['Not at all', 'To some extent', 'Completely'],
+    'Age': ['18 to 24', '25 to 34'],
+    'Gender': ['Female', 'Male', 'Non-binary'],
+    'IsStudent': ['Yes', 'No'],
+    'StudyField': ['Applied Computer Science', 'KOMEDIA', 'Other'],
+}
+CHECKBOXES = {
+    'ProgrammingCourses': ['Course01', 'Course02'],
+    'PracticedConcepts': [f'Conc0{index}' for index in range(1, 8)],
+    'PreferredGamesEasy': ['game01', 'game02'],
+    'PreferredGamesMedium': ['game01', 'game02'],
+    'PreferredGamesHard': ['game01', 'game02'],
+}
+MOTIVATIONS = [f'mot{index}' for index in range(1, 8)]
+LIKERT = ['Not at all', 'To some extent', 'To a moderate extent', 'To a large extent', 'Completely']
+
+def survey_header():
+    header = ['id'] + list(ANSWERS)
+
+    for question, options in CHECKBOXES.items():
+        header += [f'{question}[{option}]' for option in options]
+
+    header += [f'Motivations[{motivation}]' for motivation in MOTIVATIONS]
+    return header + ['PrimaryLanguage[other]', 'StudyField[other]', 'GenderOther', 'Name', 'KnownParticipants', 'OtherInterests']
+
+def survey_rows(members, seed = 0, unchecked = 'No'):
+    rng = random.Random(seed)
+    names = [f'Person{index}' for index in range(members)]
+    rows = []
+
+    for index in range(members):
+        row = [str(index)] + [rng.choice(answers) for answers in ANSWERS.values()]
+
+        for options in CHECKBOXES.values():
+            row += [rng.choice(['Yes', unchecked]) for _ in options]
+
+        row += [rng.choice(LIKERT) for _ in MOTIVATIONS]
+        row += ['', '', '', names[index], rng.choice(names) if rng.random() < 0.3 else '', f'free text {rng.randint(0, 10 ** 6)}']
+        rows.append(row)
+
+    return rows
+
+def write_survey(path, rows):
+    with open(path, 'w', newline = '') as file:
+        writer = csv.writer(file)
+        writer.writerow(survey_header())
+        writer.writerows(rows)
+
+    return str(path)
+
+@pytest.fixture(autouse = True)
+def repo_root(monkeypatch):
+    # The DataProcessor loads the weights and the interpreter from the storage folder of the repository
+    monkeypatch.chdir(ROOT)
+
+@pytest.fixture
+def make_survey(tmp_path):
+    def make(members, seed = 0, unchecked = 'No', name = 'survey.csv'):
+        return write_survey(tmp_path / name, survey_rows(members, seed, unchecked))
+
+    return make
+
+@pytest.fixture
+def make_data_processor(tmp_path, monkeypatch, make_survey):
+    from src.dataprocessor import DataProcessor
+
+    # Keep the custom weights of the tests out of the storage folder
+    monkeypatch.setattr(DataProcessor, 'CUSTOM_WEIGHT_FILE', str(tmp_path / 'custom_weights.csv'))
+
+    def make(members, seed = 0, unchecked = 'No'):
+        return DataProcessor(make_survey(members, seed, unchecked), transformed_filepath = str(tmp_path / 'transformed.csv'))
+
+    return make
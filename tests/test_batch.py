@@ -0,0 +1,30 @@
+import json
+import os
+import pandas as pd
+from src.batch import BatchRunner, run_event
+from src.dataprocessor import DataProcessor
+from src.teamforming import TeamForming
+
+def test_manifest_names_stay_inside_the_output_directory_and_the_seed_is_used(tmp_path, monkeypatch, make_survey):
+    monkeypatch.setattr(DataProcessor, 'CUSTOM_WEIGHT_FILE', str(tmp_path / 'custom_weights.csv'))
+    survey = make_survey(20)
+    manifest = tmp_path / 'manifest.json'
+    manifest.write_text(json.dumps({'config': {'seed': 3}, 'events': [
+        {'name': '../escape', 'survey': os.path.basename(survey)},
+        {'name': str(tmp_path / 'absolute'), 'survey': os.path.basename(survey)}
+    ]}))
+
+    output_dir = tmp_path / 'results'
+    events = BatchRunner(str(manifest), str(output_dir)).events
+    summaries = [run_event(event, str(output_dir)) for event in events]
+
+    assert [summary['status'] for summary in summaries] == ['done', 'done']
+    assert sorted(os.listdir(output_dir)) == sorted(event['name'] for event in events)
+    assert not (tmp_path / 'escape').exists()
+
+    # The teams of the event are the seeded teams of the survey
+    data_processor = DataProcessor(survey, transformed_filepath = str(tmp_path / 'transformed.csv'))
+    teams, _ = TeamForming(data_processor).generate_teams(4, 3, 5, seed = 3)
+    written = pd.read_csv(output_dir / events[0]['name'] / 'teams.csv')
+
+    assert [sorted(team['member']) for _, team in written.groupby('team')] == [sorted(int(member) for member in team) for team in teams]
@@ -0,0 +1,25 @@
+import pandas as pd
+from conftest import survey_rows, write_survey
+from src.dataprocessor import DataProcessor
+from src.teamforming import TeamForming
+
+def test_appended_members_match_a_full_reload(tmp_path, monkeypatch):
+    monkeypatch.setattr(DataProcessor, 'CUSTOM_WEIGHT_FILE', str(tmp_path / 'custom_weights.csv'))
+    rows = survey_rows(30)
+
+    data_processor = DataProcessor(write_survey(tmp_path / 'survey.csv', rows[:25]), transformed_filepath = str(tmp_path / 'transformed.csv'))
+    teamforming = TeamForming(data_processor)
+    teams, _ = teamforming.generate_teams_greedy(4, 3, 5, refine = True)
+    teamforming.set_teams(teams)
+    new_members = data_processor.append_survey(write_survey(tmp_path / 'late.csv', rows[25:]))
+
+    reloaded = DataProcessor(write_survey(tmp_path / 'full.csv', rows), transformed_filepath = str(tmp_path / 'full_transformed.csv'))
+
+    assert new_members == list(range(25, 30))
+    assert teamforming.df is data_processor.get_data()
+    pd.testing.assert_frame_equal(data_processor.get_data(), reloaded.get_data(), check_dtype = False)
+    assert pd.read_csv(tmp_path / 'transformed.csv').shape == pd.read_csv(tmp_path / 'full_transformed.csv').shape
+
+    # The late arrivals are placed into the current teams
+    teams, remaining_members = teamforming.insert_members(new_members, 5)
+    assert sorted(member for team in teams for member in team) + sorted(remaining_members) == list(range(30))
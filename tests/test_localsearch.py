@@ -0,0 +1,20 @@
+import numpy as np
+from src.localsearch import LocalSearch, TeamState
+
+def random_state(teams, seed = 0):
+    rng = np.random.default_rng(seed)
+    total_members = sum(len(team) for team in teams)
+    compatibility_matrix = rng.random((total_members, total_members))
+    compatibility_matrix = (compatibility_matrix + compatibility_matrix.T) / 2
+    np.fill_diagonal(compatibility_matrix, 0)
+
+    return TeamState(teams, rng.random(total_members), compatibility_matrix)
+
+def test_separate_swaps_a_forbidden_pair_out_of_a_team_at_min_size():
+    # Moving a member of the first team into the smaller second team would leave the first team below the minimum size
+    state = random_state([[0, 1, 2], [3, 4], [5, 6, 7, 8]])
+    local_search = LocalSearch(state, min_size = 3, max_size = 5, forbidden = {0: [1], 1: [0]})
+
+    assert local_search.separate() == 0
+    assert state.labels[0] != state.labels[1]
+    assert list(state.sizes) == [3, 2, 4]
@@ -0,0 +1,44 @@
+import time
+import pytest
+from src.service import TeamService, validate_job
+
+@pytest.mark.parametrize('config', [
+    {'seed': '1'},
+    {'seed': 1.5},
+    {'ordinal': 'yes'},
+    {'project_capacity': 0},
+    {'project_capacity': 'all'},
+    {'roles': ['GitFamiliarity']},
+    {'roles': [{'attribute': 'GitFamiliarity'}]},
+    {'roles': [{'attribute': 'GitFamiliarity', 'values': 'completely'}]},
+    {'roles': [{'attribute': 'GitFamiliarity', 'values': ['completely'], 'min': '1'}]},
+])
+def test_validate_job_rejects_invalid_fields(config):
+    with pytest.raises(ValueError):
+        validate_job({'survey_id': 'survey', 'config': config})
+
+def test_validate_job_accepts_valid_fields():
+    validate_job({'survey_id': 'survey', 'config': {
+        'seed': 3, 'ordinal': True, 'project_capacity': True,
+        'roles': [{'attribute': 'GitFamiliarity', 'values': ['completely'], 'min': 1}]
+    }})
+    validate_job({'survey_id': 'survey', 'config': {'project_capacity': 2, 'seed': None}})
+
+def wait_for_job(service, job_id, timeout = 5.0):
+    deadline = time.time() + timeout
+
+    while service.get_job(job_id)['status'] in ('queued', 'running') and time.time() < deadline:
+        time.sleep(0.01)
+
+    return service.get_job(job_id)
+
+def test_jobs_fail_when_the_worker_pool_is_shut_down():
+    service = TeamService(max_workers = 1)
+    service.shutdown()
+    service.surveys['survey'] = None # The job never reaches a worker
+
+    # The dispatcher keeps running after a rejected job
+    for _ in range(2):
+        job = wait_for_job(service, service.submit('survey', {}))
+        assert job['status'] == 'failed'
+        assert 'worker pool' in job['error']
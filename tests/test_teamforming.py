@@ -0,0 +1,121 @@
+import numpy as np
+import pytest
+from src.teamforming import TeamForming
+
+def team_sizes(teams):
+    return sorted(len(team) for team in teams)
+
+@pytest.mark.parametrize('sizes', [(4, 3, 5), (5, 3, 6), (6, 4, 7)])
+def test_refined_teams_keep_the_planned_sizes(make_data_processor, sizes):
+    teamforming = TeamForming(make_data_processor(30))
+    planned_sizes = sorted(TeamForming.plan_team_sizes(30, *sizes))
+
+    teams, _ = teamforming.generate_teams(*sizes, seed = 1)
+    assert team_sizes(teams) == planned_sizes
+
+    teams, _ = teamforming.generate_teams_greedy(*sizes, refine = True)
+    assert team_sizes(teams) == planned_sizes
+
+@pytest.mark.parametrize('sizes', [(4, 3, 5), (5, 3, 6)])
+def test_the_plan_is_kept_through_refine_anneal_and_regenerate(make_data_processor, sizes):
+    teamforming = TeamForming(make_data_processor(38))
+    planned_sizes = sorted(TeamForming.plan_team_sizes(38, *sizes))
+    _, min_size, max_size = sizes
+
+    for options in ({'objective': 'balanced'}, {'diversity_weight': 5.0}, {'skill_tolerance': 0.1},
+                    {'roles': [{'attribute': 'PrimaryLanguage', 'values': ['Python'], 'min': 1}]}):
+        teams, _ = teamforming.generate_teams(*sizes, seed = 1, **options)
+        assert team_sizes(teams) == planned_sizes, options
+
+    teams, _ = teamforming.generate_teams_annealing(*sizes, iterations = 5000)
+    assert team_sizes(teams) == planned_sizes
+
+    # Pin a member into another team of the same size, a plain move would change the sizes of both teams
+    source, target = next((source, target) for source in range(len(teams)) for target in range(len(teams))
+                          if source != target and len(teams[source]) == len(teams[target]))
+    teamforming.set_teams(teams)
+    teamforming.pin_member(teams[source][0], target)
+    teamforming.forbid_pair(teams[source][1], teams[source][2])
+
+    for objective in ('sum', 'balanced'):
+        regenerated, _ = teamforming.regenerate_teams(min_size, max_size, stability_penalty = 1.0, time_budget = None, objective = objective)
+        assert team_sizes(regenerated) == planned_sizes
+        assert teams[source][0] in regenerated[target]
+
+def test_warm_start_moves_few_members_after_a_small_weight_change(make_data_processor):
+    data_processor = make_data_processor(40)
+    teamforming = TeamForming(data_processor)
+
+    # The weights change the individual scores, which only the balanced objective trades off between the teams
+    teams, _ = teamforming.generate_teams_greedy(4, 3, 5, refine = True)
+    teamforming.set_teams(teams)
+    teams, _ = teamforming.regenerate_teams(3, 5, time_budget = None, objective = 'balanced')
+    teamforming.set_teams(teams)
+
+    weights = data_processor.current_weights
+    weights['GitFamiliarity'] *= 1.1
+    data_processor.current_weights = weights
+
+    regenerated, _ = teamforming.regenerate_teams(3, 5, stability_penalty = 5.0, time_budget = None, objective = 'balanced')
+    moved_members = sum(member not in regenerated[index] for index, team in enumerate(teams) for member in team)
+
+    assert moved_members <= 4
+    assert team_sizes(regenerated) == team_sizes(teams)
+
+def test_seeded_regenerate_is_reproducible(make_data_processor):
+    teamforming = TeamForming(make_data_processor(30))
+    teams, _ = teamforming.generate_teams_greedy(4, 3, 5, refine = False)
+    results = []
+
+    for _ in range(2):
+        teamforming.set_teams(teams)
+        regenerated, _ = teamforming.regenerate_teams(3, 5, stability_penalty = 1.0, objective = 'balanced', seed = 0)
+        results.append(regenerated)
+
+    assert results[0] == results[1]
+    assert teamforming.last_run['seed'] == 0
+
+def test_annealing_improves_on_the_refined_start(make_data_processor):
+    teamforming = TeamForming(make_data_processor(120))
+    teams, remaining_members = teamforming.generate_teams_annealing(4, 3, 5, iterations = 20000, seed = 0)
+    report = teamforming.annealing_report
+
+    assert report['final_objective'] > report['start_objective']
+    assert report['best_objective'] >= report['start_objective']
+    assert team_sizes(teams) == sorted(TeamForming.plan_team_sizes(120, 4, 3, 5))
+    assert not remaining_members
+
+def test_empty_unchecked_cells_select_the_same_options(make_data_processor):
+    # Surveys export unchecked boxes either as 'No' or as empty cells, both must select the same options
+    answered = TeamForming(make_data_processor(20, unchecked = 'No'))
+    empty = TeamForming(make_data_processor(20, unchecked = ''))
+
+    assert list(empty.data_processor.get_selections('PracticedConcepts')) == list(answered.data_processor.get_selections('PracticedConcepts'))
+    assert (empty.build_compatibility_matrix() == answered.build_compatibility_matrix()).all()
+
+
+def test_a_single_checked_box_selects_its_own_option(tmp_path, monkeypatch):
+    from conftest import survey_header, survey_rows, write_survey
+    from src.dataprocessor import DataProcessor
+
+    # Only the third box is checked and the unchecked boxes are empty, the option must not move to the first box
+    header = survey_header()
+    rows = survey_rows(12, unchecked = '')
+    for column, option in enumerate(f'Conc0{index}' for index in range(1, 8)):
+        rows[0][header.index(f'PracticedConcepts[{option}]')] = 'Yes' if column == 2 else ''
+
+    monkeypatch.setattr(DataProcessor, 'CUSTOM_WEIGHT_FILE', str(tmp_path / 'custom_weights.csv'))
+    data_processor = DataProcessor(write_survey(tmp_path / 'single.csv', rows), transformed_filepath = str(tmp_path / 'single_transformed.csv'))
+    codes, masks = TeamForming(data_processor).encode_selections('PracticedConcepts')
+
+    assert data_processor.get_selections('PracticedConcepts')[0] == {'loops (for or while)'}
+    assert data_processor.get_data().loc[0, 'PracticedConcepts'] == 'loops (for or while)'
+    assert int(np.bitwise_count(masks[codes[0]]).sum()) == 1
+
+def test_pairwise_scores_match_the_compatibility_matrix(make_data_processor):
+    teamforming = TeamForming(make_data_processor(12, unchecked = ''))
+    matrix = teamforming.build_compatibility_matrix()
+
+    for member1 in range(12):
+        for member2 in range(member1 + 1, 12):
+            assert matrix[member1, member2] == pytest.approx(teamforming.calculate_compatibility_scores(member1, member2))